@@ -18,6 +18,10 @@ class AppConfig(BaseModel):
     start_fullscreen: bool = Field(True, description="Start VM in fullscreen mode")
     snapshot_name: str = Field("clean", description="Default snapshot name to revert to")
     use_snapshots: bool = Field(True, description="Whether to use snapshot revert before tasks")
+    shared_folder_host: str = Field("", description="Host directory shared with the guest for large file copies (empty to disable)")
+    shared_folder_name: str = Field("annotator", description="VMware shared folder name for shared_folder_host")
+    guest_login_timeout: int = Field(180, description="Seconds to wait after a VM start for the guest to accept commands")
+    persistent_ps_session: bool = Field(False, description="Run guest PowerShell commands through a persistent TCP server in the guest (needs a guest firewall rule; isolated VM networks only)")
     # Auto-login removed - VM configured with dedicated auto-login software
 
 
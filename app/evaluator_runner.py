@@ -23,27 +23,31 @@ class EvaluatorRunner:
 
         try:
             # Ensure guest directories exist
-            vm.ensure_guest_dir(self.guest_evaluator_dir)
-            vm.ensure_guest_dir(self.guest_task_dir)
+            vm.ensure_guest_dirs([self.guest_evaluator_dir, self.guest_task_dir])
             
-            # Copy evaluator script to guest
-            host_eval_script = Path(__file__).parent.parent / "evaluators" / "eval.py"
+            # Copy the evaluator script and its requirements to the guest in parallel
+            evaluators_dir = Path(__file__).parent.parent / "evaluators"
+            host_eval_script = evaluators_dir / "eval.py"
+            host_requirements = evaluators_dir / "requirements.txt"
+            guest_eval_path = f"{self.guest_evaluator_dir}\\eval.py"
+            guest_req_path = f"{self.guest_evaluator_dir}\\requirements.txt"
+            
+            copies = []
             if host_eval_script.exists():
-                guest_eval_path = f"{self.guest_evaluator_dir}\\eval.py"
-                vm.copy_to_guest(str(host_eval_script), guest_eval_path)
-                logger.info(f"Copied evaluator script to guest: {guest_eval_path}")
+                copies.append((str(host_eval_script), guest_eval_path))
             else:
                 logger.warning(f"Evaluator script not found: {host_eval_script}")
+            if host_requirements.exists():
+                copies.append((str(host_requirements), guest_req_path))
+            vm.copy_to_guest_many(copies)
+            for _, guest_path in copies:
+                logger.info(f"Copied to guest: {guest_path}")
             
-            # Copy requirements.txt if it exists
-            host_requirements = Path(__file__).parent.parent / "evaluators" / "requirements.txt"
+            # Install requirements if they were copied
             if host_requirements.exists():
-                guest_req_path = f"{self.guest_evaluator_dir}\\requirements.txt"
-                vm.copy_to_guest(str(host_requirements), guest_req_path)
-                logger.info(f"Copied requirements to guest: {guest_req_path}")
                 vm.run_in_guest(
                     "C:\\Windows\\System32\\WindowsPowerShell\\v1.0\\powershell.exe",
-                    ["-NoProfile", "-ExecutionPolicy", "Bypass", "-Command", f"pip install -r {guest_req_path}"],
+                    ["-NoProfile", "-NonInteractive", "-ExecutionPolicy", "Bypass", "-Command", f"pip install -r {guest_req_path}"],
                     interactive=True, nowait=True
                 )
                 
@@ -128,6 +132,7 @@ class EvaluatorRunner:
 
             powershell_args = [
                 "-NoProfile",
+                "-NonInteractive",
                 "-ExecutionPolicy", "Bypass",
                 "-Command",
                 eval_cmdline
@@ -113,6 +113,9 @@ class TaskExecutionThread(QThread):
             error_msg = f"Task execution failed: {str(e)}"
             logger.error(error_msg)
             self.finished.emit(False, error_msg)
+        
+        finally:
+            self.vm.close()
 
 
 class AnnotatorKitGUI(QMainWindow):
@@ -815,6 +818,7 @@ class AnnotatorKitGUI(QMainWindow):
         self.add_status_message("🔍 Starting task validation...")
         self.update_floating_overlay_status("Validating...")
         
+        vm = None
         try:
             # Create VM controller and evaluator runner
             vm = VMController()
@@ -896,6 +900,9 @@ class AnnotatorKitGUI(QMainWindow):
             self.show_error("Validation Error", error_msg)
         
         finally:
+            if vm is not None:
+                vm.close()
+            
             # Hide progress bar and re-enable button
             self.progress_bar.setVisible(False)
             self.validate_button.setEnabled(True)
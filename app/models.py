@@ -1,5 +1,6 @@
 """Pydantic models for OSWorld task configuration."""
 
+import json
 from typing import Dict, List, Optional, Any, Literal
 from pydantic import BaseModel, Field
 
@@ -42,7 +43,6 @@ class Task(BaseModel):
     @classmethod
     def parse_file(cls, path: str) -> "Task":
         """Parse task from JSON file."""
-        import json
         with open(path, 'r', encoding='utf-8') as f:
             data = json.load(f)
         return cls(**data)
@@ -2,11 +2,18 @@
 
 import time
 import json
+import base64
+import codecs
+import functools
 import os
+import hashlib
+import ntpath
+import tempfile
 import subprocess
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any, Callable
+from typing import Dict, Any, Callable, Optional
 from .models import Task, Action
 from .vm_control import VMController
 from .logging_setup import get_logger
@@ -20,10 +27,33 @@ def register(action_type: str):
     """Decorator to register action handlers."""
     def decorator(func):
         ACTION_HANDLERS[action_type] = func
-        logger.debug(f"Registered action handler: {action_type}")
+        logger.debug("Registered action handler: %s", action_type)
         return func
     return decorator
 
+# Optional pre-render hooks: pure (action -> payload) functions whose output the
+# matching handler consumes via take_prepared(). run_config runs them while a
+# preceding sleep action is waiting.
+ACTION_PREPARERS: Dict[str, Callable[[Action], Any]] = {}
+_prepared: Dict[int, Any] = {}
+
+def preparer(action_type: str):
+    """Decorator to register a pre-render hook for an action type."""
+    def decorator(func):
+        ACTION_PREPARERS[action_type] = func
+        return func
+    return decorator
+
+def take_prepared(action: Action) -> Any:
+    """Return the pre-rendered payload for an action, rendering it now if needed."""
+    key = id(action)
+    if key in _prepared:
+        return _prepared.pop(key)
+    return ACTION_PREPARERS[action.type](action)
+
+def _prepare_into_cache(action: Action) -> None:
+    _prepared[id(action)] = ACTION_PREPARERS[action.type](action)
+
 
 class TaskRunner:
     """Executes OSWorld task configurations with comprehensive action support."""
@@ -31,7 +61,7 @@ class TaskRunner:
     def __init__(self):
         # Initialize with registered handlers
         self.action_handlers = ACTION_HANDLERS.copy()
-        logger.info(f"TaskRunner initialized with {len(self.action_handlers)} action handlers")
+        logger.info("TaskRunner initialized with %d action handlers", len(self.action_handlers))
     
     def run_config(self, task: Task, vm: VMController) -> None:
         """Execute all actions in the task configuration with retry logic.
@@ -40,28 +70,50 @@ class TaskRunner:
             task: The task to execute
             vm: VM controller instance
         """
-        logger.info(f"Starting task configuration for: {task.id}")
+        logger.info("Starting task configuration for: %s", task.id)
+        
+        with ThreadPoolExecutor(max_workers=1) as prep_pool:
+            try:
+                self._run_actions(task, vm, prep_pool)
+            finally:
+                _prepared.clear()
         
+        logger.info("Task configuration completed")
+    
+    def _run_actions(self, task: Task, vm: VMController, prep_pool: ThreadPoolExecutor) -> None:
+        """Run the configured actions in order, pre-rendering the next one during sleeps."""
         for i, action in enumerate(task.config):
-            logger.info(f"Executing action {i+1}/{len(task.config)}: {action.type}")
+            logger.info("Executing action %d/%d: %s", i + 1, len(task.config), action.type)
+            
+            # Overlap the next action's script rendering with a sleep
+            pending = None
+            next_action = task.config[i + 1] if i + 1 < len(task.config) else None
+            if action.type == "sleep" and next_action is not None and next_action.type in ACTION_PREPARERS:
+                pending = prep_pool.submit(_prepare_into_cache, next_action)
             
             # Try to find specific handler
             handler = self.action_handlers.get(action.type)
             if handler:
                 try:
                     handler(action, vm, task)
-                    logger.info(f"Action {action.type} completed successfully")
+                    logger.info("Action %s completed successfully", action.type)
                 except Exception as e:
-                    logger.error(f"Action {action.type} failed: {e}")
+                    logger.error("Action %s failed: %s", action.type, e)
                     raise
+                finally:
+                    if pending is not None:
+                        try:
+                            pending.result()
+                        except Exception as e:
+                            logger.debug("Pre-render of %s failed, will retry inline: %s", next_action.type, e)
             else:
                 # Fallback to generic handler
-                logger.warning(f"Unknown action type: {action.type}, using generic handler")
+                logger.warning("Unknown action type: %s, using generic handler", action.type)
                 try:
                     self._handle_generic_action(action, vm, task)
-                    logger.info(f"Generic action {action.type} completed")
+                    logger.info("Generic action %s completed", action.type)
                 except Exception as e:
-                    logger.error(f"Generic action {action.type} failed: {e}")
+                    logger.error("Generic action %s failed: %s", action.type, e)
                     raise
             
             # Add delay between actions to prevent timing issues
@@ -81,14 +133,12 @@ class TaskRunner:
                 delay = action_delays.get(action.type, 2.0)  # Default 2 seconds
                 
                 if delay > 0:
-                    logger.info(f"Waiting {delay} seconds before next action ({next_action_type})...")
+                    logger.info("Waiting %s seconds before next action (%s)...", delay, next_action_type)
                     time.sleep(delay)
-        
-        logger.info("Task configuration completed")
     
     def _handle_generic_action(self, action: Action, vm: VMController, task: Task) -> None:
         """Handle unknown action types using the generic action runner."""
-        logger.warning(f"Unknown action type: {action.type}, using generic handler")
+        logger.warning("Unknown action type: %s, using generic handler", action.type)
         
         # Create action file for the generic runner
         action_data = {
@@ -98,15 +148,16 @@ class TaskRunner:
         }
         
         # Create temporary action file
-        import tempfile
-        import json
-        import os
-        
         with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
             json.dump(action_data, f, indent=2)
             temp_file = f.name
         
         try:
+            # Copy generic action runner to guest in parallel with the action file
+            runner_script = "C:\\evaluators\\generic_action_runner.py"
+            host_runner = os.path.join(os.path.dirname(__file__), "..", "evaluators", "generic_action_runner.py")
+            runner_copy = vm.copy_to_guest_async(host_runner, runner_script)
+            
             # Copy action file to guest
             guest_actions_dir = "C:\\Tasks\\actions"
             vm.ensure_guest_dir(guest_actions_dir)
@@ -116,30 +167,26 @@ class TaskRunner:
             
             vm.copy_to_guest(temp_file, guest_action_file)
             
-            # Copy generic action runner to guest if not already there
-            runner_script = "C:\\evaluators\\generic_action_runner.py"
-            host_runner = os.path.join(os.path.dirname(__file__), "..", "evaluators", "generic_action_runner.py")
-            
             try:
-                vm.copy_to_guest(host_runner, runner_script)
+                runner_copy.result()
             except Exception as e:
-                logger.warning(f"Could not copy generic runner to guest: {e}")
+                logger.warning("Could not copy generic runner to guest: %s", e)
             
             # Run generic action runner in guest using full PowerShell command
             ps_command = f'python "{runner_script}" --action "{guest_action_file}"'
             
-            logger.info(f"Executing generic action via: {ps_command}")
+            logger.info("Executing generic action via: %s", ps_command)
             result = vm.run_in_guest(
                 "C:\\Windows\\System32\\WindowsPowerShell\\v1.0\\powershell.exe",
-                ["-NoProfile", "-ExecutionPolicy", "Bypass", "-Command", ps_command],
+                ["-NoProfile", "-NonInteractive", "-ExecutionPolicy", "Bypass", "-Command", ps_command],
                 interactive=True,
                 nowait=True
             )
             
             if result == 0:
-                logger.info(f"Generic action {action.type} completed")
+                logger.info("Generic action %s completed", action.type)
             else:
-                logger.warning(f"Generic action runner returned non-zero exit code: {result}")
+                logger.warning("Generic action runner returned non-zero exit code: %s", result)
 
         finally:
             # Clean up temporary file
@@ -149,8 +196,36 @@ class TaskRunner:
                 pass
 
 
+# Linux -> Windows path translation for OSWorld task paths
+_HOME_PREFIX = "/home/user/"
+_WINDOWS_HOME = "C:\\Users\\user\\"
+_PATH_TABLE = str.maketrans({"/": "\\"})
+
+def _to_windows(path: str) -> str:
+    """Translate an OSWorld Linux path (e.g. /home/user/x) to its Windows equivalent."""
+    if path.startswith(_HOME_PREFIX):
+        path = _WINDOWS_HOME + path[len(_HOME_PREFIX):]
+    return path.translate(_PATH_TABLE)
+
+
 # Core Action Handlers
 
+# Map common program names to Windows paths (keys casefolded)
+_PROGRAM_MAPPINGS = {k.casefold(): v for k, v in {
+    "google-chrome": "C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe",
+    "chrome": "C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe",
+    "notepad": "C:\\Windows\\System32\\notepad.exe",
+    "powershell": "C:\\Windows\\System32\\WindowsPowerShell\\v1.0\\powershell.exe",
+    "code": "C:\\Users\\user\\AppData\\Local\\Programs\\Microsoft VS Code\\Code.exe",
+    "vlc": "C:\\Program Files\\VideoLAN\\VLC\\vlc.exe",
+}.items()}
+
+@functools.lru_cache(maxsize=64)
+def _resolve_program(program: str) -> str:
+    """Resolve a program name to its Windows path, or return it unchanged."""
+    return _PROGRAM_MAPPINGS.get(program.casefold(), program)
+
+
 @register("launch")
 def handle_launch(action: Action, vm: VMController, task: Task) -> bool:
     """Handle program launch actions."""
@@ -182,31 +257,20 @@ def handle_launch(action: Action, vm: VMController, task: Task) -> bool:
     
     # Skip socat launches - they're not needed for basic Chrome functionality
     if "socat" in program.lower():
-        logger.info(f"Skipping socat launch (not required): {program}")
+        logger.info("Skipping socat launch (not required): %s", program)
         return True
     
-    logger.info(f"Launching program: {program} with args: {args}")
-    
-    # Map common program names to Windows paths
-    program_mappings = {
-        "google-chrome": "C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe",
-        "chrome": "C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe",
-        "notepad": "C:\\Windows\\System32\\notepad.exe",
-        "powershell": "C:\\Windows\\System32\\WindowsPowerShell\\v1.0\\powershell.exe",
-        "code": "C:\\Users\\user\\AppData\\Local\\Programs\\Microsoft VS Code\\Code.exe",
-        "vlc": "C:\\Program Files\\VideoLAN\\VLC\\vlc.exe",
-    }
+    logger.info("Launching program: %s with args: %s", program, args)
     
     # Use mapping if available, otherwise use as-is
-    if program in program_mappings:
-        program = program_mappings[program]
+    program = _resolve_program(program)
     
     try:
         if shell:
             # For shell commands, use PowerShell to execute
             result = vm.run_in_guest(
                 "C:\\Windows\\System32\\WindowsPowerShell\\v1.0\\powershell.exe",
-                ["-NoProfile", "-ExecutionPolicy", "Bypass", "-Command", program],
+                ["-NoProfile", "-NonInteractive", "-ExecutionPolicy", "Bypass", "-Command", program],
                 interactive=True,
                 nowait=True
             )
@@ -223,10 +287,10 @@ def handle_launch(action: Action, vm: VMController, task: Task) -> bool:
             
             return True
         else:
-            logger.warning(f"Program exited with non-zero code: {result}")
+            logger.warning("Program exited with non-zero code: %s", result)
             return True  # Still consider it successful for launch actions
     except Exception as e:
-        logger.error(f"Failed to launch program: {e}")
+        logger.error("Failed to launch program: %s", e)
         return False
 
 
@@ -234,7 +298,7 @@ def handle_launch(action: Action, vm: VMController, task: Task) -> bool:
 def handle_sleep(action: Action, vm: VMController, task: Task) -> None:
     """Handle sleep action - pause execution for specified seconds."""
     seconds = action.parameters.get("seconds", 1)
-    logger.info(f"Sleeping for {seconds} seconds")
+    logger.info("Sleeping for %s seconds", seconds)
     time.sleep(seconds)
 
 
@@ -246,14 +310,14 @@ def handle_execute(action: Action, vm: VMController, task: Task) -> bool:
         logger.error("Execute action requires 'command' parameter")
         return False
     
-    logger.info(f"Executing command: {command}")
+    logger.info("Executing command: %s", command)
     
     try:
         if isinstance(command, str):
             # Execute as shell command
             result = vm.run_in_guest(
                 "C:\\Windows\\System32\\WindowsPowerShell\\v1.0\\powershell.exe",
-                ["-NoProfile", "-ExecutionPolicy", "Bypass", "-Command", command],
+                ["-NoProfile", "-NonInteractive", "-ExecutionPolicy", "Bypass", "-Command", command],
                 interactive=True,
                 nowait=True
             )
@@ -268,7 +332,7 @@ def handle_execute(action: Action, vm: VMController, task: Task) -> bool:
                 python_script = " ".join(args[1:])
                 result = vm.run_in_guest(
                     "C:\\Windows\\System32\\WindowsPowerShell\\v1.0\\powershell.exe",
-                    ["-NoProfile", "-ExecutionPolicy", "Bypass", "-Command", f'python -c "{python_script}"'],
+                    ["-NoProfile", "-NonInteractive", "-ExecutionPolicy", "Bypass", "-Command", f'python -c "{python_script}"'],
                     interactive=True,
                     nowait=True
                 )
@@ -282,11 +346,11 @@ def handle_execute(action: Action, vm: VMController, task: Task) -> bool:
             logger.info("Execute action completed successfully")
             return True
         else:
-            logger.warning(f"Execute command returned exit code: {result}")
+            logger.warning("Execute command returned exit code: %s", result)
             return True  # Still consider successful for execute actions
             
     except Exception as e:
-        logger.error(f"Error executing command: {e}")
+        logger.error("Error executing command: %s", e)
         return False
 
 
@@ -310,32 +374,19 @@ def _render_close(ps_template: str, port: int, profile: str, match_mode: str, ur
             .replace("<<MATCH_MODE>>", match_mode)
             .replace("<<URLS_ARRAY>>", arr))
 
-@register("chrome_open_tabs")
-def handle_chrome_open_tabs(action: Action, vm: VMController, task: Task) -> bool:
-    import hashlib
-
-    def _stable_port_from_tag(tag: str) -> int:
-        h = int(hashlib.md5(tag.encode("utf-8")).hexdigest(), 16)
-        return 9222 + (h % 2000)
+def _stable_port_from_tag(tag: str) -> int:
+    h = int(hashlib.md5(tag.encode("utf-8")).hexdigest(), 16)
+    return 9222 + (h % 2000)
 
-    def _to_ps_single_quoted_array(items):
-        # -> 'a', 'b', 'c'
-        out = []
-        for s in items:
-            s = str(s).replace("'", "''")  # PowerShell 单引号转义
-            out.append(f"'{s}'")
-        return ", ".join(out)
-
-    urls = action.parameters.get("urls", []) or action.parameters.get("urls_to_open", [])
-    if not urls:
-        logger.info("chrome_open_tabs: no URLs")
-        return True
-
-    window_tag = action.parameters.get("window_tag", "osworld")
-    port = action.parameters.get("debug_port") or _stable_port_from_tag(window_tag)
-    profile = rf"C:\ChromeProfile\{window_tag}"
+def _write_script_ps(script_body: str, script_path: str) -> str:
+    return f"""
+New-Item -ItemType Directory -Force -Path "C:\\temp" | Out-Null
+@'
+{script_body}
+'@ | Out-File -FilePath "{script_path}" -Encoding UTF8
+"""
 
-    PS_OPEN = r'''$ErrorActionPreference = 'Continue'
+PS_OPEN = r'''$ErrorActionPreference = 'Continue'
 $ProgressPreference = 'SilentlyContinue'
 
 $port    = <<PORT>>
@@ -437,59 +488,7 @@ Write-Host ('SUCCESS OPENED=' + $opened + ' PORT=' + $port + ' PROFILE=' + $prof
 exit 0
 '''
 
-    ps_open = _render_open(PS_OPEN, port, profile, urls)
-
-    # 写入并执行
-    script_path = r"C:\temp\chrome_open.ps1"
-    create_ps = f"""
-New-Item -ItemType Directory -Force -Path "C:\\temp" | Out-Null
-@'
-{ps_open}
-'@ | Out-File -FilePath "{script_path}" -Encoding UTF8
-"""
-    try:
-        vm.run_in_guest(
-            r"C:\Windows\System32\WindowsPowerShell\v1.0\powershell.exe",
-            ["-NoProfile", "-ExecutionPolicy", "Bypass", "-Command", create_ps],
-            interactive=True, nowait=False
-        )
-        rc = vm.run_in_guest(
-            r"C:\Windows\System32\WindowsPowerShell\v1.0\powershell.exe",
-            ["-NoProfile", "-ExecutionPolicy", "Bypass", "-File", script_path],
-            interactive=True, nowait=False
-        )
-        if rc == 0:
-            logger.info("chrome_open_tabs: success")
-            return True
-        logger.warning(f"chrome_open_tabs: exit code {rc}")
-        return False
-    except Exception as e:
-        logger.error(f"chrome_open_tabs error: {e}")
-        return False
-
-
-@register("chrome_close_tabs")
-def handle_chrome_close_tabs(action: Action, vm: VMController, task: Task) -> bool:
-    import hashlib
-
-    def _stable_port_from_tag(tag: str) -> int:
-        h = int(hashlib.md5(tag.encode("utf-8")).hexdigest(), 16)
-        return 9222 + (h % 2000)
-
-    def _to_ps_single_quoted_array(items):
-        out = []
-        for s in (items or []):
-            s = str(s).replace("'", "''")
-            out.append(f"'{s}'")
-        return ", ".join(out)
-
-    urls_to_close = action.parameters.get("urls_to_close", [])
-    match_mode = action.parameters.get("match_mode", "substring")  # substring|prefix|exact
-    window_tag = action.parameters.get("window_tag", "osworld")
-    port = action.parameters.get("debug_port") or _stable_port_from_tag(window_tag)
-    profile = rf"C:\ChromeProfile\{window_tag}"
-
-    PS_CLOSE = r'''$ErrorActionPreference = 'Continue'
+PS_CLOSE = r'''$ErrorActionPreference = 'Continue'
 $ProgressPreference = 'SilentlyContinue'
 
 $port      = <<PORT>>
@@ -562,33 +561,88 @@ try {
 exit 0
 '''
 
+
+@preparer("chrome_open_tabs")
+def prepare_chrome_open_tabs(action: Action) -> Optional[str]:
+    """Render the guest script that writes chrome_open.ps1, or None if there is nothing to open."""
+    urls = action.parameters.get("urls", []) or action.parameters.get("urls_to_open", [])
+    if not urls:
+        return None
+
+    window_tag = action.parameters.get("window_tag", "osworld")
+    port = action.parameters.get("debug_port") or _stable_port_from_tag(window_tag)
+    profile = rf"C:\ChromeProfile\{window_tag}"
+
+    ps_open = _render_open(PS_OPEN, port, profile, urls)
+    return _write_script_ps(ps_open, r"C:\temp\chrome_open.ps1")
+
+
+@register("chrome_open_tabs")
+def handle_chrome_open_tabs(action: Action, vm: VMController, task: Task) -> bool:
+    create_ps = take_prepared(action)
+    if create_ps is None:
+        logger.info("chrome_open_tabs: no URLs")
+        return True
+
+    # 写入并执行
+    script_path = r"C:\temp\chrome_open.ps1"
+    try:
+        vm.run_in_guest(
+            r"C:\Windows\System32\WindowsPowerShell\v1.0\powershell.exe",
+            ["-NoProfile", "-NonInteractive", "-ExecutionPolicy", "Bypass", "-Command", create_ps],
+            interactive=True, nowait=False
+        )
+        rc = vm.run_in_guest(
+            r"C:\Windows\System32\WindowsPowerShell\v1.0\powershell.exe",
+            ["-NoProfile", "-NonInteractive", "-ExecutionPolicy", "Bypass", "-File", script_path],
+            interactive=True, nowait=False
+        )
+        if rc == 0:
+            logger.info("chrome_open_tabs: success")
+            return True
+        logger.warning("chrome_open_tabs: exit code %s", rc)
+        return False
+    except Exception as e:
+        logger.error("chrome_open_tabs error: %s", e)
+        return False
+
+
+@preparer("chrome_close_tabs")
+def prepare_chrome_close_tabs(action: Action) -> str:
+    """Render the guest script that writes chrome_close.ps1."""
+    urls_to_close = action.parameters.get("urls_to_close", [])
+    match_mode = action.parameters.get("match_mode", "substring")  # substring|prefix|exact
+    window_tag = action.parameters.get("window_tag", "osworld")
+    port = action.parameters.get("debug_port") or _stable_port_from_tag(window_tag)
+    profile = rf"C:\ChromeProfile\{window_tag}"
+
     ps_close = _render_close(PS_CLOSE, port, profile, match_mode, urls_to_close)
+    return _write_script_ps(ps_close, r"C:\temp\chrome_close.ps1")
+
+
+@register("chrome_close_tabs")
+def handle_chrome_close_tabs(action: Action, vm: VMController, task: Task) -> bool:
+    create_ps = take_prepared(action)
 
     script_path = r"C:\temp\chrome_close.ps1"
-    create_ps = f"""
-New-Item -ItemType Directory -Force -Path "C:\\temp" | Out-Null
-@'
-{ps_close}
-'@ | Out-File -FilePath "{script_path}" -Encoding UTF8
-"""
     try:
         vm.run_in_guest(
             r"C:\Windows\System32\WindowsPowerShell\v1.0\powershell.exe",
-            ["-NoProfile", "-ExecutionPolicy", "Bypass", "-Command", create_ps],
+            ["-NoProfile", "-NonInteractive", "-ExecutionPolicy", "Bypass", "-Command", create_ps],
             interactive=True, nowait=False
         )
         rc = vm.run_in_guest(
             r"C:\Windows\System32\WindowsPowerShell\v1.0\powershell.exe",
-            ["-NoProfile", "-ExecutionPolicy", "Bypass", "-File", script_path],
+            ["-NoProfile", "-NonInteractive", "-ExecutionPolicy", "Bypass", "-File", script_path],
             interactive=True, nowait=False
         )
         if rc == 0:
             logger.info("chrome_close_tabs: success")
             return True
-        logger.warning(f"chrome_close_tabs: exit code {rc}")
+        logger.warning("chrome_close_tabs: exit code %s", rc)
         return True  # best-effort
     except Exception as e:
-        logger.error(f"chrome_close_tabs error: {e}")
+        logger.error("chrome_close_tabs error: %s", e)
         return False
 
 
@@ -609,11 +663,11 @@ def handle_download(action: Action, vm: VMController, task: Task) -> bool:
             path = file_info.get("path", "")
             
             if not url or not path:
-                logger.error(f"Invalid file info: {file_info}")
+                logger.error("Invalid file info: %s", file_info)
                 success = False
                 continue
             
-            logger.info(f"Downloading {url} to {path}")
+            logger.info("Downloading %s to %s", url, path)
             
             # Use PowerShell to download file
             ps_command = f"""
@@ -629,19 +683,19 @@ def handle_download(action: Action, vm: VMController, task: Task) -> bool:
             try:
                 result = vm.run_in_guest(
                     "C:\\Windows\\System32\\WindowsPowerShell\\v1.0\\powershell.exe",
-                    ["-NoProfile", "-ExecutionPolicy", "Bypass", "-Command", ps_command],
+                    ["-NoProfile", "-NonInteractive", "-ExecutionPolicy", "Bypass", "-Command", ps_command],
                     interactive=True,
                     nowait=True
                 )
                 
                 if result != 0:
-                    logger.error(f"Failed to download {url}")
+                    logger.error("Failed to download %s", url)
                     success = False
                 else:
-                    logger.info(f"Successfully downloaded {url} to {path}")
+                    logger.info("Successfully downloaded %s to %s", url, path)
                     
             except Exception as e:
-                logger.error(f"Error downloading {url}: {e}")
+                logger.error("Error downloading %s: %s", url, e)
                 success = False
     
     return success
@@ -656,7 +710,10 @@ def handle_open(action: Action, vm: VMController, task: Task) -> bool:
         logger.error("Open action missing 'path' parameter")
         return False
     
-    logger.info(f"Opening file: {path}")
+    # Convert Linux path to Windows path
+    path = _to_windows(path)
+    
+    logger.info("Opening file: %s", path)
     
     # Use PowerShell Start-Process to open file with default application
     ps_command = f"Start-Process -FilePath '{path}'"
@@ -664,20 +721,20 @@ def handle_open(action: Action, vm: VMController, task: Task) -> bool:
     try:
         result = vm.run_in_guest(
             "C:\\Windows\\System32\\WindowsPowerShell\\v1.0\\powershell.exe",
-            ["-NoProfile", "-ExecutionPolicy", "Bypass", "-Command", ps_command],
+            ["-NoProfile", "-NonInteractive", "-ExecutionPolicy", "Bypass", "-Command", ps_command],
             interactive=True,
             nowait=True
         )
         
         if result == 0:
-            logger.info(f"Successfully opened {path}")
+            logger.info("Successfully opened %s", path)
             return True
         else:
-            logger.warning(f"Open command returned exit code: {result}")
+            logger.warning("Open command returned exit code: %s", result)
             return True  # Still consider successful for open actions
             
     except Exception as e:
-        logger.error(f"Error opening {path}: {e}")
+        logger.error("Error opening %s: %s", path, e)
         return False
 
 
@@ -691,7 +748,7 @@ def handle_activate_window(action: Action, vm: VMController, task: Task) -> bool
         logger.error("activate_window action missing 'window_name' parameter")
         return False
     
-    logger.info(f"Activating window: {window_name} (strict={strict})")
+    logger.info("Activating window: %s (strict=%s)", window_name, strict)
     
     # Use PowerShell to activate window
     ps_command = f"""
@@ -719,101 +776,25 @@ def handle_activate_window(action: Action, vm: VMController, task: Task) -> bool
     try:
         result = vm.run_in_guest(
             "C:\\Windows\\System32\\WindowsPowerShell\\v1.0\\powershell.exe",
-            ["-NoProfile", "-ExecutionPolicy", "Bypass", "-Command", ps_command],
+            ["-NoProfile", "-NonInteractive", "-ExecutionPolicy", "Bypass", "-Command", ps_command],
             interactive=True,
             nowait=True
         )
         
         if result == 0:
-            logger.info(f"Successfully activated window: {window_name}")
+            logger.info("Successfully activated window: %s", window_name)
             return True
         else:
-            logger.warning(f"Could not activate window: {window_name}")
+            logger.warning("Could not activate window: %s", window_name)
             return False
             
     except Exception as e:
-        logger.error(f"Error activating window {window_name}: {e}")
+        logger.error("Error activating window %s: %s", window_name, e)
         return False
 
 
-# File Operation Handlers
-
-@register("download_old")
-def handle_download_old(action: Action, vm: VMController, task: Task) -> None:
-    """Handle download action - download files to guest VM."""
-    files = action.parameters.get("files", [])
-    if not files:
-        raise ValueError("Download action requires 'files' parameter")
-    
-    for file_info in files:
-        url = file_info.get("url")
-        path = file_info.get("path")
-        
-        if not url or not path:
-            logger.warning(f"Skipping invalid file entry: {file_info}")
-            continue
-        
-        # Convert Linux path to Windows path
-        windows_path = path.replace("/home/user/", "C:\\Users\\user\\")
-        windows_path = windows_path.replace("/", "\\")
-        
-        # Create directory if needed
-        dir_path = Path(windows_path).parent
-        powershell_cmd = f"New-Item -ItemType Directory -Force -Path '{dir_path}'"
-        vm.run_in_guest("powershell.exe", ["-Command", powershell_cmd])
-        
-        # Download file using PowerShell
-        download_cmd = f"Invoke-WebRequest -Uri '{url}' -OutFile '{windows_path}'"
-        logger.info(f"Downloading {url} to {windows_path}")
-        vm.run_in_guest("powershell.exe", ["-Command", download_cmd])
-
-
-@register("open")
-def handle_open(action: Action, vm: VMController, task: Task) -> None:
-    """Handle open action - open files with default application."""
-    path = action.parameters.get("path")
-    if not path:
-        raise ValueError("Open action requires 'path' parameter")
-    
-    # Convert Linux path to Windows path
-    windows_path = path.replace("/home/user/", "C:\\Users\\user\\")
-    windows_path = windows_path.replace("/", "\\")
-    
-    logger.info(f"Opening file: {windows_path}")
-    # Use start command to open with default application
-    vm.run_in_guest("cmd.exe", ["/c", "start", f'"{windows_path}"'])
-
-
 # Window Management Handlers
 
-@register("activate_window")
-def handle_activate_window(action: Action, vm: VMController, task: Task) -> None:
-    """Handle activate_window action - bring window to focus."""
-    window_name = action.parameters.get("window_name")
-    strict = action.parameters.get("strict", False)
-    
-    if not window_name:
-        raise ValueError("activate_window action requires 'window_name' parameter")
-    
-    # Use PowerShell to activate window
-    if strict:
-        powershell_cmd = f"""
-        Add-Type -AssemblyName Microsoft.VisualBasic
-        [Microsoft.VisualBasic.Interaction]::AppActivate('{window_name}')
-        """
-    else:
-        powershell_cmd = f"""
-        $window = Get-Process | Where-Object {{$_.MainWindowTitle -like '*{window_name}*'}} | Select-Object -First 1
-        if ($window) {{
-            Add-Type -AssemblyName Microsoft.VisualBasic
-            [Microsoft.VisualBasic.Interaction]::AppActivate($window.Id)
-        }}
-        """
-    
-    logger.info(f"Activating window: {window_name}")
-    vm.run_in_guest("powershell.exe", ["-Command", powershell_cmd])
-
-
 @register("close_window")
 def handle_close_window(action: Action, vm: VMController, task: Task) -> None:
     """Handle close_window action - close specific window."""
@@ -823,16 +804,19 @@ def handle_close_window(action: Action, vm: VMController, task: Task) -> None:
     if not window_name:
         raise ValueError("close_window action requires 'window_name' parameter")
     
-    # Use PowerShell to close window
+    # Pass the name base64-encoded so quotes/backticks in it need no escaping
+    name_b64 = base64.b64encode(window_name.encode("utf-8")).decode("ascii")
+    powershell_cmd = f"$name = [Text.Encoding]::UTF8.GetString([Convert]::FromBase64String('{name_b64}'))\n"
     if strict:
-        powershell_cmd = f"Stop-Process -Name '{window_name}' -Force -ErrorAction SilentlyContinue"
+        powershell_cmd += "Stop-Process -Name $name -Force -ErrorAction SilentlyContinue"
     else:
-        powershell_cmd = f"""
-        Get-Process | Where-Object {{$_.MainWindowTitle -like '*{window_name}*'}} | Stop-Process -Force -ErrorAction SilentlyContinue
-        """
+        powershell_cmd += (
+            "Get-Process | Where-Object {$_.MainWindowTitle -like ('*' + $name + '*')} | "
+            "Stop-Process -Force -ErrorAction SilentlyContinue"
+        )
     
-    logger.info(f"Closing window: {window_name}")
-    vm.run_in_guest("powershell.exe", ["-Command", powershell_cmd])
+    logger.info("Closing window: %s", window_name)
+    vm.ps_session.invoke(powershell_cmd)
 
 
 # System Operation Handlers
@@ -842,10 +826,17 @@ def handle_set_env(action: Action, vm: VMController, task: Task) -> None:
     """Handle set_env action - set environment variables."""
     env_vars = action.parameters.get("variables", {})
     
+    if not env_vars:
+        return
+    
+    # One invocation for all variables; single quotes doubled for PowerShell
+    ps_lines = []
     for name, value in env_vars.items():
-        powershell_cmd = f"[Environment]::SetEnvironmentVariable('{name}', '{value}', 'User')"
-        logger.info(f"Setting environment variable: {name}={value}")
-        vm.run_in_guest("powershell.exe", ["-Command", powershell_cmd])
+        logger.info("Setting environment variable: %s=%s", name, value)
+        n = str(name).replace("'", "''")
+        v = str(value).replace("'", "''")
+        ps_lines.append(f"[Environment]::SetEnvironmentVariable('{n}', '{v}', 'User')")
+    vm.ps_session.invoke("; ".join(ps_lines))
 
 
 @register("kill_process")
@@ -856,14 +847,14 @@ def handle_kill_process(action: Action, vm: VMController, task: Task) -> None:
     
     if process_name:
         powershell_cmd = f"Stop-Process -Name '{process_name}' -Force -ErrorAction SilentlyContinue"
-        logger.info(f"Killing process by name: {process_name}")
+        logger.info("Killing process by name: %s", process_name)
     elif process_id:
         powershell_cmd = f"Stop-Process -Id {process_id} -Force -ErrorAction SilentlyContinue"
-        logger.info(f"Killing process by ID: {process_id}")
+        logger.info("Killing process by ID: %s", process_id)
     else:
         raise ValueError("kill_process action requires 'name' or 'pid' parameter")
     
-    vm.run_in_guest("powershell.exe", ["-Command", powershell_cmd])
+    vm.ps_session.invoke(powershell_cmd)
 
 
 @register("powershell")
@@ -874,12 +865,12 @@ def handle_powershell(action: Action, vm: VMController, task: Task) -> None:
     
     if script:
         # Execute PowerShell script
-        logger.info(f"Executing PowerShell script")
-        vm.run_in_guest("powershell.exe", ["-File", script])
+        logger.info("Executing PowerShell script")
+        vm.ps_session.invoke(f"& '{script.translate(_PS_SINGLE_QUOTE_TABLE)}'")
     elif command:
         # Execute PowerShell command
-        logger.info(f"Executing PowerShell command: {command}")
-        vm.run_in_guest("powershell.exe", ["-Command", command])
+        logger.info("Executing PowerShell command: %s", command)
+        vm.ps_session.invoke(command)
     else:
         raise ValueError("powershell action requires 'script' or 'command' parameter")
 
@@ -891,7 +882,7 @@ def handle_shell(action: Action, vm: VMController, task: Task) -> None:
     if not command:
         raise ValueError("shell action requires 'command' parameter")
     
-    logger.info(f"Executing shell command: {command}")
+    logger.info("Executing shell command: %s", command)
     vm.run_in_guest("cmd.exe", ["/c", command])
 
 
@@ -906,7 +897,7 @@ def handle_copy_to_guest(action: Action, vm: VMController, task: Task) -> None:
     if not source or not destination:
         raise ValueError("copy_to_guest action requires 'source' and 'destination' parameters")
     
-    logger.info(f"Copying file to guest: {source} -> {destination}")
+    logger.info("Copying file to guest: %s -> %s", source, destination)
     # This would need VM-specific implementation
     # For now, log the operation
     logger.warning("copy_to_guest not fully implemented - requires VM file transfer capability")
@@ -921,12 +912,47 @@ def handle_copy_from_guest(action: Action, vm: VMController, task: Task) -> None
     if not source or not destination:
         raise ValueError("copy_from_guest action requires 'source' and 'destination' parameters")
     
-    logger.info(f"Copying file from guest: {source} -> {destination}")
+    logger.info("Copying file from guest: %s -> %s", source, destination)
     # This would need VM-specific implementation
     # For now, log the operation
     logger.warning("copy_from_guest not fully implemented - requires VM file transfer capability")
 
 
+# Content above this size is copied as a file rather than embedded in a command
+_INLINE_WRITE_LIMIT = 64 * 1024
+_PS_SINGLE_QUOTE_TABLE = str.maketrans({"'": "''"})
+
+# Set-Content -Encoding names (Windows PowerShell 5.1) -> (Python codec, BOM). "utf-8"
+# is this action's default and means UTF-8 without a BOM. Default/OEM use the host's
+# ANSI/OEM code pages, which match the guest's on same-locale setups.
+_PS_ENCODINGS = {
+    "utf-8": ("utf-8", b""),
+    "utf8": ("utf-8", codecs.BOM_UTF8),
+    "unicode": ("utf-16-le", codecs.BOM_UTF16_LE),
+    "string": ("utf-16-le", codecs.BOM_UTF16_LE),
+    "bigendianunicode": ("utf-16-be", codecs.BOM_UTF16_BE),
+    "utf32": ("utf-32-le", codecs.BOM_UTF32_LE),
+    "bigendianutf32": ("utf-32-be", codecs.BOM_UTF32_BE),
+    "utf7": ("utf-7", b""),
+    "ascii": ("ascii", b""),
+    "default": ("mbcs", b""),
+    "oem": ("oem", b""),
+}
+
+
+def _encode_like_set_content(content: str, encoding: str) -> bytes:
+    """Encode content as Set-Content -Encoding <encoding> would write it, trailing newline included."""
+    try:
+        codec, bom = _PS_ENCODINGS[encoding.lower()]
+    except KeyError:
+        raise ValueError(
+            f"write_file: unsupported encoding '{encoding}' "
+            f"(expected one of: {', '.join(sorted(_PS_ENCODINGS))})"
+        ) from None
+    # Set-Content writes '?' for characters the encoding cannot represent
+    return bom + (content + "\r\n").encode(codec, errors="replace")
+
+
 @register("write_file")
 def handle_write_file(action: Action, vm: VMController, task: Task) -> None:
     """Handle write_file action - write content to files."""
@@ -938,21 +964,38 @@ def handle_write_file(action: Action, vm: VMController, task: Task) -> None:
         raise ValueError("write_file action requires 'path' and 'content' parameters")
     
     # Convert Linux path to Windows path
-    windows_path = path.replace("/home/user/", "C:\\Users\\user\\")
-    windows_path = windows_path.replace("/", "\\")
+    windows_path = _to_windows(path)
+    escaped_path = windows_path.translate(_PS_SINGLE_QUOTE_TABLE)
+    
+    data = _encode_like_set_content(content, encoding)
     
-    # Escape content for PowerShell
-    escaped_content = content.replace("'", "''").replace("`", "``")
+    if len(data) > _INLINE_WRITE_LIMIT:
+        # Large content goes through vmrun's file copy instead of the command line
+        with tempfile.NamedTemporaryFile(mode='wb', suffix='.tmp', delete=False) as f:
+            f.write(data)
+            temp_file = f.name
+        try:
+            logger.info("Writing file via host copy (%d bytes): %s", len(data), windows_path)
+            # The parent has to exist before the copy starts; ensure_guest_dirs checks the exit code
+            vm.ensure_guest_dirs([ntpath.dirname(windows_path)])
+            vm.copy_to_guest(temp_file, windows_path)
+        finally:
+            try:
+                os.unlink(temp_file)
+            except OSError:
+                pass
+        return
     
+    # Ship the encoded bytes as base64 so the content never needs escaping
+    data_b64 = base64.b64encode(data).decode("ascii")
     powershell_cmd = f"""
-    $content = '{escaped_content}'
-    $path = '{windows_path}'
+    $path = '{escaped_path}'
     New-Item -ItemType Directory -Force -Path (Split-Path $path -Parent) | Out-Null
-    Set-Content -Path $path -Value $content -Encoding {encoding}
+    [IO.File]::WriteAllBytes($path, [Convert]::FromBase64String('{data_b64}'))
     """
     
-    logger.info(f"Writing file: {windows_path}")
-    vm.run_in_guest("powershell.exe", ["-Command", powershell_cmd])
+    logger.info("Writing file: %s", windows_path)
+    vm.ps_session.invoke(powershell_cmd)
 
 
 @register("unzip")
@@ -968,10 +1011,27 @@ def handle_unzip(action: Action, vm: VMController, task: Task) -> None:
         destination = str(Path(source).parent)
     
     # Convert paths to Windows format
-    windows_source = source.replace("/home/user/", "C:\\Users\\user\\").replace("/", "\\")
-    windows_dest = destination.replace("/home/user/", "C:\\Users\\user\\").replace("/", "\\")
+    windows_source = _to_windows(source)
+    windows_dest = _to_windows(destination)
+    escaped_source = windows_source.translate(_PS_SINGLE_QUOTE_TABLE)
+    escaped_dest = windows_dest.translate(_PS_SINGLE_QUOTE_TABLE)
     
-    powershell_cmd = f"Expand-Archive -Path '{windows_source}' -DestinationPath '{windows_dest}' -Force"
+    # Extract with System.IO.Compression directly; Expand-Archive walks every entry
+    # through the cmdlet pipeline and is much slower on archives with many files.
+    # Windows PowerShell's .NET Framework has no overwrite overload of
+    # ZipFile.ExtractToDirectory, so overwrite (-Force semantics) per entry instead.
+    powershell_cmd = (
+        "Add-Type -AssemblyName System.IO.Compression.FileSystem; "
+        f"$dest = [IO.Path]::GetFullPath('{escaped_dest}'); "
+        "[void][IO.Directory]::CreateDirectory($dest); "
+        f"$zip = [IO.Compression.ZipFile]::OpenRead('{escaped_source}'); "
+        "try { foreach ($entry in $zip.Entries) { "
+        "$target = [IO.Path]::Combine($dest, $entry.FullName); "
+        "if ($entry.Name -eq '') { [void][IO.Directory]::CreateDirectory($target); continue }; "
+        "[void][IO.Directory]::CreateDirectory([IO.Path]::GetDirectoryName($target)); "
+        "[IO.Compression.ZipFileExtensions]::ExtractToFile($entry, $target, $true) "
+        "} } finally { $zip.Dispose() }"
+    )
     
-    logger.info(f"Extracting archive: {windows_source} -> {windows_dest}")
-    vm.run_in_guest("powershell.exe", ["-Command", powershell_cmd])
+    logger.info("Extracting archive: %s -> %s", windows_source, windows_dest)
+    vm.ps_session.invoke(powershell_cmd)
@@ -1,16 +1,50 @@
 """VMware virtual machine control via vmrun and vmware.exe."""
 
 import os
+import json
+import logging
+import base64
+import functools
+import socket
+import secrets
+import shutil
+import threading
 import subprocess
+import sys
 import time
 import random
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from pathlib import Path
-from typing import List, Optional, Callable, Any
+from typing import TYPE_CHECKING, List, Optional, Callable, Any, Tuple
 from .config import config_manager
 from .logging_setup import get_logger
 
+if TYPE_CHECKING:
+    from rich.progress import Progress
+
 logger = get_logger(__name__)
 
+GUEST_POWERSHELL = "C:\\Windows\\System32\\WindowsPowerShell\\v1.0\\powershell.exe"
+
+# File that always exists in the guest; fileExistsInGuest on it is the cheapest authenticated probe
+GUEST_PROBE_FILE = "C:\\Windows\\System32\\cmd.exe"
+
+# Host executables, resolved once; the configuration is not reloaded at runtime
+_VMRUN_PATH = os.path.normpath(config_manager.get_vmrun_path())
+_VMWARE_PATH = os.path.normpath(config_manager.get_vmware_path())
+
+
+def _decode_vmrun(b: bytes) -> str:
+    """Decode vmrun output: ASCII fast path, then UTF-8, then the ANSI code page."""
+    if not b:
+        return ""
+    if b.isascii():
+        return b.decode("ascii")
+    try:
+        return b.decode("utf-8")
+    except UnicodeDecodeError:
+        return b.decode("mbcs", errors="replace")
+
 
 class VMOperationError(Exception):
     """Custom exception for VM operations."""
@@ -22,35 +56,112 @@ class VMTimeoutError(VMOperationError):
     pass
 
 
+class VMNonRetryableError(VMOperationError):
+    """Exception for VM failures that retrying cannot fix (bad credentials, guest down)."""
+    pass
+
+
+class VMAuthenticationError(VMNonRetryableError):
+    """Exception for guest operations rejected because of wrong guest credentials."""
+    pass
+
+
+# vmrun messages that mean another attempt would fail the same way
+_AUTH_FAILURE_MARKER = "Invalid user name or password"
+
+_NON_RETRYABLE_MARKERS = (
+    _AUTH_FAILURE_MARKER,
+    "The guest operating system is not running",
+)
+
+
+def _raise_if_non_retryable(output: str) -> None:
+    """Raise VMNonRetryableError if vmrun output reports a permanent failure."""
+    for marker in _NON_RETRYABLE_MARKERS:
+        if marker in output:
+            error = VMAuthenticationError if marker == _AUTH_FAILURE_MARKER else VMNonRetryableError
+            raise error(f"vmrun failed: {output.strip()}")
+
+
 class VMController:
     """Controls VMware virtual machines using vmrun and vmware.exe with enhanced robustness."""
     
+    # How long an is_running() answer is reused before spawning vmrun list again
+    IS_RUNNING_TTL = 1.0
+    
+    # Files larger than this go through the shared folder when one is configured
+    SHARED_FOLDER_MIN_SIZE = 1 << 20
+    
     def __init__(self):
         self.config = config_manager.config
-        self.vmrun_path = config_manager.get_vmrun_path()
-        self.vmware_path = config_manager.get_vmware_path()
-        self.vmx_path = self.config.vmx_path
-        self.vmrun_path = os.path.normpath(self.vmrun_path)
-        self.vmware_path = os.path.normpath(self.vmware_path)
-        self.vmx_path = os.path.normpath(self.vmx_path)
+        self.vmrun_path = _VMRUN_PATH
+        self.vmware_path = _VMWARE_PATH
+        self.vmx_path = os.path.normpath(self.config.vmx_path)
+        
+        # Lowercased, backslash-separated VMX path and file name as matched against vmrun list
+        self._vmx_key = self.vmx_path.lower().replace('/', '\\')
+        self._vmx_basename = self._vmx_key.rpartition('\\')[2]
+        
+        # Leading vmrun arguments for every guest operation
+        self._guest_auth_args = ("-T", "ws", "-gu", self.config.guest_username,
+                                 "-gp", self.config.guest_password)
         
         # Status callback for GUI updates
         self.status_callback: Optional[Callable[[str], None]] = None
+        self._status_thread: Optional[int] = None
+        
+        # Lazily started persistent PowerShell host in the guest
+        self._ps_session: Optional["PersistentPSSession"] = None
+        
+        # None until the shared folder has been set up (or found unusable) this power cycle
+        self._shared_folder_ready: Optional[bool] = None
+        
+        # (monotonic timestamp, result) of the last is_running() probe
+        self._is_running_cache: Optional[Tuple[float, bool]] = None
+        
+        # Host-side workers for independent guest operations
+        self._pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="vmrun")
+        
+        # Console for Rich progress displays (None lets Rich pick stdout)
+        self._console = getattr(logger, 'console', None)
+    
+    @property
+    def ps_session(self) -> "PersistentPSSession":
+        """Persistent guest PowerShell session, created on first use."""
+        if self._ps_session is None:
+            self._ps_session = PersistentPSSession(self)
+        return self._ps_session
+    
+    def reset_ps_session(self) -> None:
+        """Drop the guest PowerShell session (e.g. after the guest was reverted)."""
+        if self._ps_session is not None:
+            self._ps_session.close()
+            self._ps_session = None
+    
+    def close(self) -> None:
+        """Release host-side resources: the worker pool and the guest PowerShell session."""
+        self._pool.shutdown(wait=False)
+        self.reset_ps_session()
     
     def set_status_callback(self, callback: Callable[[str], None]) -> None:
-        """Set callback function for status updates."""
+        """Set callback function for status updates.
+        
+        The callback is only invoked on the thread that registered it; messages from
+        worker-pool threads are logged instead, so GUI widget callbacks stay safe.
+        """
         self.status_callback = callback
+        self._status_thread = threading.get_ident()
     
     def _update_status(self, message: str) -> None:
         """Update status via callback if available."""
-        if self.status_callback:
+        if self.status_callback and threading.get_ident() == self._status_thread:
             self.status_callback(message)
         else:
             logger.info(message)
     
     def _retry_with_backoff(self, operation: Callable[[], Any], max_attempts: int = 3, 
                            base_delay: float = 1.0, max_delay: float = 30.0,
-                           operation_name: str = "operation") -> Any:
+                           operation_name: str = "operation", jitter_mode: str = "full") -> Any:
         """
         Retry an operation with exponential backoff.
         
@@ -60,6 +171,8 @@ class VMController:
             base_delay: Base delay in seconds
             max_delay: Maximum delay in seconds
             operation_name: Name for logging
+            jitter_mode: "full" sleeps uniformly in [0, capped exponential delay];
+                "decorrelated" sleeps uniformly in [base_delay, 3 * previous delay], capped
             
         Returns:
             Result of successful operation
@@ -68,6 +181,7 @@ class VMController:
             VMOperationError: If all attempts fail
         """
         last_exception = None
+        prev_delay = base_delay
         
         for attempt in range(1, max_attempts + 1):
             try:
@@ -77,15 +191,20 @@ class VMController:
                     self._update_status(f"{operation_name} succeeded on attempt {attempt}")
                 return result
                 
+            except VMNonRetryableError as e:
+                self._update_status(f"{operation_name} failed and cannot be retried: {e}")
+                raise
             except Exception as e:
                 last_exception = e
                 logger.warning(f"{operation_name} attempt {attempt} failed: {e}")
                 
                 if attempt < max_attempts:
-                    # Calculate delay with exponential backoff and jitter
-                    delay = min(base_delay * (2 ** (attempt - 1)), max_delay)
-                    jitter = random.uniform(0, 0.1 * delay)  # Add up to 10% jitter
-                    total_delay = delay + jitter
+                    # Randomize the whole delay so concurrent retries spread out
+                    if jitter_mode == "decorrelated":
+                        total_delay = min(max_delay, random.uniform(base_delay, prev_delay * 3))
+                        prev_delay = total_delay
+                    else:
+                        total_delay = random.uniform(0, min(base_delay * (2 ** (attempt - 1)), max_delay))
                     
                     self._update_status(f"Retrying {operation_name} in {total_delay:.1f} seconds...")
                     time.sleep(total_delay)
@@ -96,18 +215,24 @@ class VMController:
 
     def start(self, fullscreen: bool = True) -> None:
         """Start the virtual machine after revert to snapshot with retry logic."""
-        def _start_operation():
-            self._update_status("Starting virtual machine...")
-            cmd = [self.vmware_path, "-X" if fullscreen else "start", self.vmx_path]
-            process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            time.sleep(20)
-            if self.is_running():
-                self._update_status("VM started successfully")
-                return True
-            else:
-                raise VMOperationError("VM failed to start")
+        self._retry_with_backoff(functools.partial(self._start_once, fullscreen),
+                                 max_attempts=3, operation_name="VM start")
+    
+    def _start_once(self, fullscreen: bool = True) -> bool:
+        """Single start attempt for start(); composite operations call it under their own retry."""
+        self._update_status("Starting virtual machine...")
+        cmd = [self.vmware_path, "-X" if fullscreen else "start", self.vmx_path]
+        # vmware.exe lives as long as the VM; never leave it writing into an unread pipe
+        subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.invalidate_running_cache()
+        if not self._poll_until(self.is_running, timeout=20):
+            raise VMOperationError("VM failed to start")
+        self._update_status("VM started successfully")
         
-        self._retry_with_backoff(_start_operation, max_attempts=3, operation_name="VM start")
+        # Return as soon as the guest accepts commands instead of after a fixed delay
+        if not self._wait_for_user_login(timeout=self.config.guest_login_timeout):
+            logger.warning("Guest did not accept commands after start; continuing anyway")
+        return True
    
     def start_from_scratch(self, fullscreen: bool = True) -> None:
         """Start the virtual machine if it's off with enhanced error handling."""
@@ -121,30 +246,22 @@ class VMController:
                 
                 try:
                     # Start the process without waiting for it to complete
-                    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+                    # vmware.exe lives as long as the VM; never leave it writing into an unread pipe
+                    process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                    self.invalidate_running_cache()
                     self._update_status("VM fullscreen process started, checking status...")
                     
-                    # Wait and check if VM is running
-                    time.sleep(10)
+                    # Poll until vmrun list reports the VM or vmware.exe exits with an error
+                    def _failed() -> bool:
+                        return process.poll() not in (None, 0)
                     
-                    if not self.is_running():
-                        # Check if process failed immediately
-                        poll_result = process.poll()
-                        if poll_result is not None and poll_result != 0:
-                            _, stderr = process.communicate()
-                            raise VMOperationError(f"Failed to start VM: {stderr.decode()}")
-                        
-                        # Wait a bit more for VM to start
-                        self._update_status("VM not detected yet, waiting longer...")
-                        time.sleep(10)
-                        
-                        if not self.is_running():
-                            logger.warning("VM not detected by vmrun list, but vmware process is running")
-                            self._update_status("VM starting up (process running but not yet detected)")
-                        else:
-                            self._update_status("VM detected and running!")
-                    else:
+                    if self._poll_until(lambda: _failed() or self.is_running(), timeout=20):
+                        if _failed():
+                            raise VMOperationError(f"Failed to start VM: vmware.exe exited with code {process.returncode}")
                         self._update_status("VM detected and running!")
+                    else:
+                        logger.warning("VM not detected by vmrun list, but vmware process is running")
+                        self._update_status("VM starting up (process running but not yet detected)")
                     
                     return True
                     
@@ -157,6 +274,7 @@ class VMController:
                 
                 try:
                     result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+                    self.invalidate_running_cache()
                     if result.returncode != 0:
                         raise VMOperationError(f"Failed to start VM: {result.stderr}")
                     self._update_status("VM started successfully in normal mode")
@@ -176,80 +294,20 @@ class VMController:
         if args is None:
             args = []
 
-        def _run_operation():
-            cmd = [
-                self.vmrun_path, "-T", "ws",
-                "-gu", self.config.guest_username,
-                "-gp", self.config.guest_password,
-                "runProgramInGuest", self.vmx_path
-            ]
-            if nowait:
-                cmd.append("-noWait")
-            if interactive:
-                cmd += ["-interactive", "-activeWindow"]
-            if workdir:
-                cmd += ["-workingDirectory", workdir]
-            cmd.append(program_path)
-            cmd += args
-
-            def _q(s: str) -> str:
-                return f"\"{s}\"" if (" " in s or "\t" in s) else s
-
-            self._update_status(f"Running in guest: {program_path} {' '.join(args)}")
-            logger.debug("> " + " ".join(_q(x) for x in cmd))
-
-            try:
-                result = subprocess.run(
-                    cmd,
-                    capture_output=True,
-                    text=False,
-                    timeout=timeout,
-                    shell=False,
-                )
-            except subprocess.TimeoutExpired:
-                raise VMTimeoutError(f"Guest program execution timed out after {timeout} seconds")
-            except Exception as e:
-                raise VMOperationError(f"Error running guest program: {e}")
-
-            # Manually decode bytes, first try utf-8, then mbcs as fallback
-            def _decode(b: bytes) -> str:
-                if not b:
-                    return ""
-                try:
-                    return b.decode("utf-8")
-                except UnicodeDecodeError:
-                    return b.decode("mbcs", errors="replace")
-
-            stdout = _decode(result.stdout)
-            stderr = _decode(result.stderr)
-
-            # Check return code
-            rc = result.returncode
-            if rc == 0:
-                if stdout:
-                    logger.debug(f"Guest stdout: {stdout}")
-                if stderr:
-                    logger.debug(f"Guest stderr: {stderr}")
-                return 0
-
-            # If return code is non-zero, check for definite errors
-            if stdout:
-                logger.debug(f"Guest stdout: {stdout}")
-            if stderr:
-                logger.debug(f"Guest stderr: {stderr}")
-
-            # Some versions of vmrun print "Error:" to stdout
-            is_definitely_error = ("Error:" in stdout) or ("错误" in stdout) or ("失败" in stdout)
-            
-            if is_definitely_error:
-                raise VMOperationError(f"Guest program failed with error: stdout={stdout if stdout else 'None'}, stderr={stderr if stderr else 'None'}")
-            
-            logger.warning(f"Guest program returned non-zero exit code: {rc}")
-            return rc
+        # The command line is the same for every attempt, so build it once
+        cmd = [self.vmrun_path, *self._guest_auth_args, "runProgramInGuest", self.vmx_path]
+        if nowait:
+            cmd.append("-noWait")
+        if interactive:
+            cmd += ["-interactive", "-activeWindow"]
+        if workdir:
+            cmd += ["-workingDirectory", workdir]
+        cmd.append(program_path)
+        cmd += args
 
         try:
             return self._retry_with_backoff(
-                _run_operation, 
+                functools.partial(self._run_in_guest_once, cmd, program_path, args, timeout),
                 max_attempts=max_attempts, 
                 operation_name=f"run {program_path}"
             )
@@ -258,68 +316,218 @@ class VMController:
             logger.error(f"Guest program execution failed after {max_attempts} attempts")
             return -1
 
-    def _run_vmrun(self, args: List[str], timeout: int = 120):
+    def _run_in_guest_once(self, cmd: List[str], program_path: str, args: List[str], timeout: int) -> int:
+        """Single runProgramInGuest attempt for run_in_guest."""
+        self._update_status(f"Running in guest: {program_path} {' '.join(args)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("> %s", subprocess.list2cmdline(cmd))
+
+        try:
+            rc, out, err = self._exec(cmd, timeout)
+        except subprocess.TimeoutExpired:
+            raise VMTimeoutError(f"Guest program execution timed out after {timeout} seconds")
+        except Exception as e:
+            raise VMOperationError(f"Error running guest program: {e}")
+
+        # Check return code; on success the output is only needed for debug logging
+        if rc == 0:
+            if logger.isEnabledFor(logging.DEBUG):
+                if out:
+                    logger.debug("Guest stdout: %s", _decode_vmrun(out))
+                if err:
+                    logger.debug("Guest stderr: %s", _decode_vmrun(err))
+            return 0
+
+        stdout = _decode_vmrun(out)
+        stderr = _decode_vmrun(err)
+
+        # If return code is non-zero, check for definite errors
+        if stdout:
+            logger.debug("Guest stdout: %s", stdout)
+        if stderr:
+            logger.debug("Guest stderr: %s", stderr)
+
+        _raise_if_non_retryable(stdout + stderr)
+        
+        # Some versions of vmrun print "Error:" to stdout
+        is_definitely_error = ("Error:" in stdout) or ("错误" in stdout) or ("失败" in stdout)
+        
+        if is_definitely_error:
+            raise VMOperationError(f"Guest program failed with error: stdout={stdout if stdout else 'None'}, stderr={stderr if stderr else 'None'}")
+        
+        logger.warning(f"Guest program returned non-zero exit code: {rc}")
+        return rc
+
+    @staticmethod
+    def _exec(cmd: List[str], timeout: float) -> Tuple[int, bytes, bytes]:
+        """Run a host process to completion and return (returncode, stdout, stderr).
+        
+        The child is killed and reaped if it outlives timeout, and
+        subprocess.TimeoutExpired is raised.
+        """
+        # stdin is closed so a vmrun that prompts (e.g. for an encrypted VM's password)
+        # fails at once instead of hanging until the timeout
+        proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE, shell=False)
+        try:
+            out, err = proc.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.communicate()
+            raise
+        return proc.returncode, out, err
+    
+    def run_in_guest_async(self, *args, **kwargs) -> "Future[int]":
+        """Submit run_in_guest to the worker pool so independent guest programs overlap."""
+        return self._pool.submit(self.run_in_guest, *args, **kwargs)
+    
+    def copy_to_guest_async(self, host_path: str, guest_path: str) -> "Future[None]":
+        """Submit copy_to_guest to the worker pool."""
+        return self._pool.submit(self.copy_to_guest, host_path, guest_path)
+    
+    def copy_to_guest_many(self, pairs: List[Tuple[str, str]]) -> None:
+        """Copy several (host_path, guest_path) files to the guest concurrently."""
+        self._wait_all([self.copy_to_guest_async(host, guest) for host, guest in pairs])
+    
+    def copy_from_guest_many(self, pairs: List[Tuple[str, str]]) -> None:
+        """Copy several (guest_path, host_path) files from the guest concurrently."""
+        self._wait_all([self._pool.submit(self.copy_from_guest, guest, host) for guest, host in pairs])
+    
+    @staticmethod
+    def _wait_all(futures: List[Future]) -> None:
+        """Wait for every future, then re-raise the first failure (each copy already retried)."""
+        errors = [f.exception() for f in futures]
+        for error in errors:
+            if error is not None:
+                raise error
+    
+    def _run_vmrun(self, args: List[str], timeout: int = 120, max_attempts: int = 3,
+                   want_output: bool = True):
         """Run vmrun command with timeout and error handling."""
-        def _vmrun_operation():
-            proc = subprocess.run(
-                [self.vmrun_path] + args,
-                capture_output=True,
-                text=False,
-                timeout=timeout,
-                shell=False,
-            )
-            
-            def _decode(b: bytes) -> str:
-                if not b: 
-                    return ""
-                try:
-                    return b.decode("utf-8")
-                except UnicodeDecodeError:
-                    return b.decode("mbcs", errors="replace")
-            
-            stdout = _decode(proc.stdout)
-            stderr = _decode(proc.stderr)
-            
-            if proc.returncode != 0:
-                raise VMOperationError(f"vmrun failed: {stderr}")
-            
-            return proc.returncode, stdout, stderr
+        return self._retry_with_backoff(
+            functools.partial(self._run_vmrun_once, args, timeout, want_output),
+            max_attempts=max_attempts, 
+            operation_name=f"vmrun {' '.join(args[:2])}"
+        )
+    
+    def _run_vmrun_once(self, args: List[str], timeout: int, want_output: bool = True) -> Tuple[int, str, str]:
+        """Single vmrun attempt without retries; raises VMOperationError on failure.
         
+        With want_output=False a successful call returns empty stdout/stderr without
+        decoding them; failures are always decoded for the error message.
+        """
         try:
-            return self._retry_with_backoff(
-                _vmrun_operation, 
-                max_attempts=3, 
-                operation_name=f"vmrun {' '.join(args[:2])}"
-            )
-        except VMTimeoutError:
+            rc, out, err = self._exec([self.vmrun_path, *args], timeout)
+        except subprocess.TimeoutExpired:
             raise VMTimeoutError(f"vmrun command timed out after {timeout} seconds")
+        
+        if rc == 0 and not want_output:
+            return rc, "", ""
+        
+        stdout = _decode_vmrun(out)
+        stderr = _decode_vmrun(err)
+        
+        if rc != 0:
+            _raise_if_non_retryable(stdout + stderr)
+            # vmrun reports its "Error: ..." text on stdout
+            raise VMOperationError(f"vmrun failed: {stdout.strip() or stderr.strip()}")
+        
+        return rc, stdout, stderr
     
     def copy_to_guest(self, host_path: str, guest_path: str) -> None:
         """Copy file to guest with retry logic."""
+        if self._copy_via_shared_folder(host_path, guest_path):
+            return
+        
         def _copy_operation():
             args = [
-                "-T", "ws",
-                "-gu", self.config.guest_username,
-                "-gp", self.config.guest_password,
+                *self._guest_auth_args,
                 "CopyFileFromHostToGuest",
                 self.vmx_path,
                 host_path,
                 guest_path,
             ]
             self._update_status(f"Copying to guest: {host_path} -> {guest_path}")
-            returncode, stdout, stderr = self._run_vmrun(args, timeout=60)
+            self._run_vmrun(args, timeout=60, want_output=False)
             self._update_status("File copied to guest successfully")
             return True
         
         self._retry_with_backoff(_copy_operation, max_attempts=3, operation_name="copy to guest")
     
+    def _ensure_shared_folder(self) -> bool:
+        """Enable the configured host shared folder once per power cycle; return whether it is usable."""
+        if self._shared_folder_ready is None:
+            name = self.config.shared_folder_name
+            try:
+                os.makedirs(self.config.shared_folder_host, exist_ok=True)
+                self._run_vmrun(["-T", "ws", "enableSharedFolders", self.vmx_path], timeout=30, max_attempts=1,
+                                want_output=False)
+                try:
+                    self._run_vmrun(["-T", "ws", "addSharedFolder", self.vmx_path, name,
+                                     os.path.abspath(self.config.shared_folder_host)],
+                                    timeout=30, max_attempts=1, want_output=False)
+                except VMOperationError:
+                    # Already added by an earlier run; make sure it points at the configured directory
+                    self._run_vmrun(["-T", "ws", "setSharedFolderState", self.vmx_path, name,
+                                     os.path.abspath(self.config.shared_folder_host), "writable"],
+                                    timeout=30, max_attempts=1, want_output=False)
+                self._shared_folder_ready = True
+            except Exception as e:
+                logger.warning("Shared folder unavailable, using vmrun copies: %s", e)
+                self._shared_folder_ready = False
+        return self._shared_folder_ready
+    
+    def _copy_via_shared_folder(self, host_path: str, guest_path: str) -> bool:
+        """Copy a large file through the shared folder; return False to use CopyFileFromHostToGuest."""
+        if not self.config.shared_folder_host:
+            return False
+        try:
+            size = os.path.getsize(host_path)
+        except OSError:
+            return False
+        if size <= self.SHARED_FOLDER_MIN_SIZE:
+            return False
+        if not self._ensure_shared_folder():
+            return False
+        
+        # Stage under a random name only, so the host file name never reaches the PowerShell literal
+        staged_name = f"{secrets.token_hex(8)}.staged"
+        staged_path = os.path.join(self.config.shared_folder_host, staged_name)
+        guest_staged = f"\\\\vmware-host\\Shared Folders\\{self.config.shared_folder_name}\\{staged_name}".replace("'", "''")
+        guest_target = guest_path.replace("'", "''")
+        try:
+            shutil.copyfile(host_path, staged_path)
+            self._update_status(f"Copying to guest via shared folder: {host_path} -> {guest_path}")
+            ps = (
+                f"New-Item -ItemType Directory -Force -Path (Split-Path -Parent '{guest_target}') | Out-Null; "
+                f"Copy-Item -LiteralPath '{guest_staged}' -Destination '{guest_target}' -Force -ErrorAction Stop"
+            )
+            # Wait for the guest copy to finish before the staged file is removed below;
+            # allow about a minute plus one second per 10 MB
+            rc = self.run_in_guest(
+                GUEST_POWERSHELL,
+                ["-NoProfile", "-NonInteractive", "-ExecutionPolicy", "Bypass", "-Command", ps],
+                interactive=False, nowait=False, timeout=60 + size // (10 << 20)
+            )
+            if rc != 0:
+                logger.warning("Shared folder copy failed (rc=%s), using vmrun copy", rc)
+                return False
+            self._update_status("File copied to guest successfully")
+            return True
+        except Exception as e:
+            logger.warning("Shared folder copy failed, using vmrun copy: %s", e)
+            return False
+        finally:
+            try:
+                os.unlink(staged_path)
+            except OSError:
+                pass
+    
     def copy_from_guest(self, guest_path: str, host_path: str) -> None:
         """Copy file from guest VM to host with retry logic."""
         def _copy_operation():
             args = [
-                "-T", "ws",
-                "-gu", self.config.guest_username,
-                "-gp", self.config.guest_password,
+                *self._guest_auth_args,
                 "CopyFileFromGuestToHost",
                 self.vmx_path,
                 guest_path,
@@ -327,27 +535,35 @@ class VMController:
             ]
             
             self._update_status(f"Copying from guest: {guest_path} -> {host_path}")
-            returncode, stdout, stderr = self._run_vmrun(args, timeout=60)
+            self._run_vmrun(args, timeout=60, want_output=False)
             self._update_status("File copied from guest successfully")
             return True
         
         self._retry_with_backoff(_copy_operation, max_attempts=3, operation_name="copy from guest")
     
-    def can_revert_snapshot(self, name: str) -> bool:
-        """Quick check if snapshot revert is possible without actually doing it."""
+    def can_revert_snapshot(self, name: str) -> Optional[bool]:
+        """Quick check if snapshot revert is possible without actually doing it.
+        
+        Returns True if the snapshot is listed, False if the list was read and it is
+        absent, and None if the snapshots could not be listed at all.
+        """
         try:
             self._update_status(f"Checking if snapshot '{name}' exists...")
             
             # First check if vmrun is accessible
             returncode, stdout, stderr = self._run_vmrun(["-T", "ws", "listSnapshots", self.vmx_path], timeout=10)
             
-            # Check if our target snapshot exists in the output
-            snapshot_exists = name in stdout
+            # One snapshot name per line after the "Total snapshots: N" header;
+            # compare whole names so "clean" does not match "clean-old"
+            snapshots = {ln.strip() for ln in stdout.splitlines()[1:] if ln.strip()}
+            snapshot_exists = name in snapshots
             if not snapshot_exists:
-                logger.info(f"Snapshot '{name}' not found in VM. Available snapshots:")
-                for line in stdout.strip().split('\n'):
-                    if line.strip():
-                        logger.info(f"  - {line.strip()}")
+                logger.info("Snapshot '%s' not found in VM. Available snapshots:", name)
+                for snapshot in sorted(snapshots):
+                    logger.info("  - %s", snapshot)
+                near = [snapshot for snapshot in snapshots if snapshot.casefold() == name.casefold()]
+                if near:
+                    logger.warning("Snapshot names differ only in case from '%s': %s", name, ", ".join(near))
             else:
                 self._update_status(f"Snapshot '{name}' found and ready for revert")
             
@@ -355,147 +571,407 @@ class VMController:
             
         except Exception as e:
             logger.warning(f"Cannot check snapshots: {e}")
-            return False
+            return None
 
     def revert_snapshot(self, name: str) -> None:
         """Revert VM to specified snapshot with enhanced error handling."""
         def _revert_operation():
-            # Quick pre-check to avoid long waits
-            if not self.can_revert_snapshot(name):
-                raise VMOperationError(f"Snapshot '{name}' not found in VM")
-            
-            # Now do the actual revert
             args = ["-T", "ws", "revertToSnapshot", self.vmx_path, name]
             self._update_status(f"Reverting to snapshot: {name}")
             
-            returncode, stdout, stderr = self._run_vmrun(args, timeout=120)
+            # No listSnapshots pre-check on the happy path; only list snapshots
+            # to explain a failure, and do not retry when the snapshot is missing.
+            # Steps run once each: the retry below is the only policy for the revert
+            try:
+                self._run_vmrun_once(args, timeout=120, want_output=False)
+            except VMOperationError:
+                # Only a confirmed-absent snapshot stops the retries; if the list
+                # could not be read either, the failure may be transient
+                if self.can_revert_snapshot(name) is False:
+                    raise VMNonRetryableError(f"Snapshot '{name}' not found in VM")
+                raise
+            self.invalidate_running_cache()
+            self.reset_ps_session()
+            self._shared_folder_ready = None
             self._update_status("Snapshot reverted, starting VM...")
-            self.start(fullscreen=True)
+            self._start_once(fullscreen=True)
             self._update_status("✓ Snapshot reverted and VM started successfully")
             return True
         
         self._retry_with_backoff(_revert_operation, max_attempts=2, operation_name="snapshot revert")
     
-    def stop(self) -> None:
-        """Stop the virtual machine with retry logic."""
+    def stop(self, soft_timeout: float = 60.0, hard_timeout: float = 30.0) -> None:
+        """Stop the virtual machine with retry logic.
+        
+        A soft stop (clean guest shutdown) is tried first; once it fails or its
+        soft_timeout deadline passes, vmrun is killed and the VM is powered off with
+        a hard stop right away. A retry after that goes straight to the hard stop.
+        """
+        soft_failed = False
+        
         def _stop_operation():
-            args = ["-T", "ws", "stop", self.vmx_path, "soft"]
-            
-            self._update_status("Stopping VM (soft stop)...")
+            nonlocal soft_failed
+            soft_error = None
+            if not soft_failed:
+                self._update_status("Stopping VM (soft stop)...")
+                try:
+                    self._run_vmrun_once(["-T", "ws", "stop", self.vmx_path, "soft"],
+                                         timeout=soft_timeout, want_output=False)
+                    self._update_status("VM stopped successfully")
+                    return True
+                except VMOperationError as e:
+                    soft_failed = True
+                    soft_error = e
+                self._update_status(f"Soft stop failed ({soft_error}), trying hard stop...")
+            else:
+                self._update_status("Stopping VM (hard stop)...")
             
             try:
-                returncode, stdout, stderr = self._run_vmrun(args, timeout=60)
-                self._update_status("VM stopped successfully")
-                return True
-            except VMOperationError:
-                # Try hard stop
-                self._update_status("Soft stop failed, trying hard stop...")
-                args[-1] = "hard"
-                returncode, stdout, stderr = self._run_vmrun(args, timeout=30)
-                self._update_status("VM stopped successfully (hard stop)")
-                return True
+                self._run_vmrun_once(["-T", "ws", "stop", self.vmx_path, "hard"],
+                                     timeout=hard_timeout, want_output=False)
+            except VMOperationError as e:
+                if soft_error is not None:
+                    raise VMOperationError(f"soft stop failed: {soft_error}; hard stop failed: {e}")
+                raise
+            self._update_status("VM stopped successfully (hard stop)")
+            return True
         
         try:
             self._retry_with_backoff(_stop_operation, max_attempts=2, operation_name="VM stop")
         except VMOperationError:
             logger.warning("VM stop failed, but continuing...")
+        finally:
+            self.invalidate_running_cache()
+    
+    @staticmethod
+    def _poll_until(predicate: Callable[[], bool], timeout: float, initial: float = 0.25,
+                    factor: float = 2.0, cap: float = 2.0) -> bool:
+        """Call predicate until it returns True or timeout seconds pass; return its last result.
+        
+        The pause between calls starts at initial and grows by factor up to cap, so an
+        early success is seen quickly while a long wait does not spin.
+        """
+        deadline = time.monotonic() + timeout
+        interval = initial
+        while True:
+            if predicate():
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(interval, remaining))
+            interval = min(interval * factor, cap)
+    
+    def invalidate_running_cache(self) -> None:
+        """Forget the cached is_running() result after a power state change."""
+        self._is_running_cache = None
     
     def is_running(self) -> bool:
-        """Check if the VM is currently running with timeout."""
+        """Check if the VM is currently running, reusing a result younger than IS_RUNNING_TTL."""
+        cached = self._is_running_cache
+        if cached is not None and time.monotonic() - cached[0] < self.IS_RUNNING_TTL:
+            return cached[1]
+        
+        result = self._probe_running()
+        self._is_running_cache = (time.monotonic(), result)
+        return result
+    
+    def _probe_running(self) -> bool:
+        """Ask vmrun list whether this VM is running."""
         try:
-            args = ["list"]
-            returncode, stdout, stderr = self._run_vmrun(args, timeout=30)
-            vm_list = stdout.strip()
+            # A single attempt: callers that wait for a state change already poll
+            returncode, stdout, stderr = self._run_vmrun_once(["list"], timeout=30)
             
-            # Use normalized path for comparison
-            norm_vmx = os.path.normpath(self.vmx_path)
-            if norm_vmx in vm_list or norm_vmx.replace('\\', '/') in vm_list:
+            # One path per line after the "Total running VMs: N" header; match
+            # case-insensitively on the full path (either separator), else the file name
+            running = {ln.strip().replace('/', '\\') for ln in stdout.lower().splitlines()[1:] if ln.strip()}
+            if self._vmx_key in running:
                 return True
-            base = os.path.basename(norm_vmx)
-            return (base in vm_list) or (norm_vmx.lower() in vm_list.lower())
+            return any(path.rpartition('\\')[2] == self._vmx_basename for path in running)
             
         except Exception as e:
             logger.warning(f"Failed to check VM status: {e}")
             return False
     
+    def get_guest_ip(self) -> Optional[str]:
+        """Get the guest IP address reported by VMware Tools, or None if unavailable."""
+        try:
+            returncode, stdout, stderr = self._run_vmrun(["-T", "ws", "getGuestIPAddress", self.vmx_path], timeout=10)
+            ip = stdout.strip()
+            return ip or None
+        except Exception as e:
+            logger.debug(f"Could not get guest IP address: {e}")
+            return None
+    
     def ensure_guest_dir(self, path: str) -> None:
         """Ensure a directory exists in the guest VM with retry logic."""
-        def _ensure_dir_operation():
-            ps = f"New-Item -ItemType Directory -Force -Path '{path}'"
-            self.run_in_guest(
-                "C:\\Windows\\System32\\WindowsPowerShell\\v1.0\\powershell.exe",
-                ["-NoProfile", "-ExecutionPolicy", "Bypass", "-Command", ps],
-                interactive=False, nowait=False
+        self.ensure_guest_dirs([path])
+    
+    def ensure_guest_dirs(self, paths: List[str]) -> None:
+        """Ensure several directories exist in the guest VM using a single guest command."""
+        if not paths:
+            return
+        
+        # Single quotes are doubled so paths with apostrophes stay inside the literal
+        ps = "; ".join(
+            "New-Item -ItemType Directory -Force -Path '{}' -ErrorAction Stop | Out-Null".format(p.replace("'", "''"))
+            for p in paths
+        )
+        
+        def _ensure_dirs_operation():
+            # run_in_guest reports failure through its return code; raise so the
+            # retry below actually retries (and it is the only retry layer)
+            rc = self.run_in_guest(
+                GUEST_POWERSHELL,
+                ["-NoProfile", "-NonInteractive", "-ExecutionPolicy", "Bypass", "-Command", ps],
+                interactive=False, nowait=False, max_attempts=1
             )
+            if rc != 0:
+                raise VMOperationError(f"creating guest directories failed with exit code {rc}")
             return True
         
-        self._retry_with_backoff(_ensure_dir_operation, max_attempts=2, operation_name=f"create directory {path}")
+        self._retry_with_backoff(_ensure_dirs_operation, max_attempts=2,
+                                 operation_name=f"create directories {', '.join(paths)}")
     
-    def _wait_for_vm_ready(self) -> None:
+    def _wait_for_vm_ready(self, timeout: float = 15.0) -> None:
         """Wait for VM to be fully ready for operations with status updates."""
         self._update_status("Waiting for VM to be fully ready...")
-        max_attempts = 15
-
-        for attempt in range(1, max_attempts + 1):
+        
+        # fileExistsInGuest is answered by VMware Tools without starting a guest process
+        args = [
+            *self._guest_auth_args,
+            "fileExistsInGuest", self.vmx_path, GUEST_PROBE_FILE
+        ]
+        
+        def _ready() -> bool:
             try:
-                self._update_status(f"Checking VM readiness ({attempt}/{max_attempts})...")
-                args = [
-                    "-T","ws","-gu",self.config.guest_username,"-gp",self.config.guest_password,
-                    "runProgramInGuest", self.vmx_path, "cmd.exe","/c","echo","test"
-                ]
-                rc, stdout, stderr = self._run_vmrun(args, timeout=5)
-                self._update_status("✓ VM is ready for operations")
-                return
+                self._run_vmrun(args, timeout=5, max_attempts=1, want_output=False)
+                return True
             except Exception:
-                if attempt < max_attempts:
-                    time.sleep(1)
+                return False
         
-        self._update_status("VM readiness check completed (proceeding with operations)")
+        if self._poll_until(_ready, timeout=timeout):
+            self._update_status("✓ VM is ready for operations")
+        else:
+            self._update_status("VM readiness check completed (proceeding with operations)")
     
-    def _wait_for_user_login(self, timeout: int = 60) -> bool:
-        """Wait for user to login to the VM with enhanced progress reporting."""
-        import time
+    def _make_progress(self, description: str) -> "Progress":
+        """Build a Rich progress display for a timed wait."""
+        # rich.progress (and the rich.live machinery behind it) is only needed for
+        # interactive waits, so keep it off the import path of vmrun-only callers
         from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TimeRemainingColumn
         
-        self._update_status(f"Waiting up to {timeout} seconds for user login...")
-        
-        with Progress(
+        # Without a terminal (GUI launch, redirected output) skip rendering entirely;
+        # the periodic _update_status messages still report progress
+        interactive = sys.stdout is not None and sys.stdout.isatty()
+        return Progress(
             SpinnerColumn(),
-            TextColumn("[bold blue]Waiting for user login..."),
+            TextColumn(f"[bold blue]{description}"),
             BarColumn(),
             TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
             TimeRemainingColumn(),
-            console=logger.console if hasattr(logger, 'console') else None
-        ) as progress:
+            console=self._console,
+            disable=not interactive
+        )
+    
+    def _wait_for_user_login(self, timeout: int = 60, probe_timeout: int = 5) -> bool:
+        """Wait for user to login to the VM, probing with exponential backoff."""
+        # Resumed or auto-logon guests are usually ready already; a ready guest answers fast
+        if self.test_guest_access(timeout=2):
+            self._update_status("✓ User already logged in")
+            return True
+        
+        self._update_status(f"Waiting up to {timeout} seconds for user login...")
+        
+        with self._make_progress("Waiting for user login...") as progress:
             
             task = progress.add_task("Login detection", total=timeout)
+            start = time.monotonic()
+            attempt = 0
+            next_report = 10
             
-            for elapsed in range(timeout):
-                # Check if user has logged in
-                if self.test_guest_access():
+            while True:
+                # Check if user has logged in; the probe runs on the pool so the
+                # progress bar keeps advancing while a slow vmrun call is in flight
+                probe_start = time.monotonic()
+                probe = self._pool.submit(self.test_guest_access, probe_timeout)
+                while True:
+                    try:
+                        logged_in = probe.result(timeout=0.5)
+                        break
+                    except FutureTimeoutError:
+                        progress.update(task, completed=min(time.monotonic() - start, timeout))
+                if logged_in:
                     progress.update(task, completed=timeout)
-                    self._update_status(f"✓ User login detected after {elapsed + 1} seconds!")
+                    self._update_status(f"✓ User login detected after {time.monotonic() - start:.0f} seconds!")
                     return True
                 
                 # Update progress bar and status
-                progress.update(task, advance=1)
-                if elapsed % 10 == 0 and elapsed > 0:
-                    self._update_status(f"Still waiting for login... ({elapsed}/{timeout}s)")
+                elapsed = time.monotonic() - start
+                progress.update(task, completed=min(elapsed, timeout))
+                if elapsed >= timeout:
+                    break
+                if elapsed >= next_report:
+                    self._update_status(f"Still waiting for login... ({int(elapsed)}/{timeout}s)")
+                    next_report += 10
+                
+                # Back off 0.5s, 0.75s, 1.1s, ... capped at 5s and at the remaining time;
+                # the interval counts from the start of the probe, so its runtime overlaps the wait
+                delay = min(5.0, 0.5 * 1.5 ** attempt, timeout - elapsed)
+                attempt += 1
+                remaining = delay - (time.monotonic() - probe_start)
+                if remaining > 0:
+                    time.sleep(remaining)
             
             self._update_status(f"✗ No user login detected after {timeout} seconds")
             return False
     
-    def test_guest_access(self) -> bool:
-        """Test if we can access the guest VM (i.e., if it's logged in) with timeout."""
+    def test_guest_access(self, timeout: int = 5) -> bool:
+        """Test if we can access the guest VM (i.e., if it's logged in) with timeout.
+        
+        Wrong guest credentials raise VMAuthenticationError, since waiting cannot fix them;
+        a guest that is still booting simply reports False.
+        """
         try:
-            args = [
-                "-T", "ws", 
-                "-gu", self.config.guest_username, 
-                "-gp", self.config.guest_password,
-                "listProcessesInGuest", 
-                self.vmx_path
-            ]
-            returncode, stdout, stderr = self._run_vmrun(args, timeout=10)
+            # Authenticated, but answers with one line instead of the whole process table
+            args = [*self._guest_auth_args, "fileExistsInGuest", self.vmx_path, GUEST_PROBE_FILE]
+            self._run_vmrun(args, timeout=timeout, max_attempts=1, want_output=False)
             return True
+        except VMAuthenticationError:
+            raise
         except Exception:
-            return False
\ No newline at end of file
+            return False
+
+
+class PersistentPSSession:
+    """Long-lived PowerShell host in the guest, reached over TCP.
+    
+    Off unless config.persistent_ps_session is set: the server listens on the guest
+    NIC behind a cleartext token and needs a guest firewall rule for its port.
+    When enabled, scripts/ps_server_guest.ps1 is copied into the guest and started
+    once; each invoke() then runs its script in a fresh runspace of that server
+    instead of launching a new powershell.exe through vmrun. If the server cannot
+    be started or reached, or the option is off, invoke() uses a one-off
+    powershell.exe via VMController.run_in_guest. close() stops the server.
+    """
+    
+    GUEST_SCRIPT = "C:\\evaluators\\ps_server_guest.ps1"
+    CONNECT_TIMEOUT = 15.0
+    
+    def __init__(self, vm: VMController):
+        self.vm = vm
+        self.port = 47800 + random.randrange(1000)
+        self._token = secrets.token_hex(16)
+        self._sock: Optional[socket.socket] = None
+        self._reader = None
+        self._disabled = not vm.config.persistent_ps_session
+        self._lock = threading.Lock()
+    
+    def _start_server(self) -> bool:
+        """Copy the server script into the guest, launch it and connect."""
+        guest_ip = self.vm.get_guest_ip()
+        if not guest_ip:
+            return False
+        
+        host_script = os.path.join(os.path.dirname(__file__), "..", "scripts", "ps_server_guest.ps1")
+        try:
+            self.vm.ensure_guest_dir(os.path.dirname(self.GUEST_SCRIPT))
+            self.vm.copy_to_guest(host_script, self.GUEST_SCRIPT)
+        except Exception as e:
+            logger.warning(f"Could not copy PowerShell server to guest: {e}")
+            return False
+        
+        self.vm.run_in_guest(
+            GUEST_POWERSHELL,
+            ["-NoProfile", "-NonInteractive", "-ExecutionPolicy", "Bypass", "-File", self.GUEST_SCRIPT,
+             "-Port", str(self.port), "-Token", self._token],
+            interactive=True, nowait=True
+        )
+        
+        deadline = time.monotonic() + self.CONNECT_TIMEOUT
+        while time.monotonic() < deadline:
+            try:
+                self._sock = socket.create_connection((guest_ip, self.port), timeout=1)
+                self._reader = self._sock.makefile("r", encoding="utf-8", newline="\n")
+                logger.info(f"Connected to guest PowerShell session at {guest_ip}:{self.port}")
+                return True
+            except OSError:
+                time.sleep(0.5)
+        
+        logger.warning(f"Guest PowerShell session not reachable at {guest_ip}:{self.port}")
+        return False
+    
+    def _fallback(self, script: str, timeout: int) -> int:
+        # -EncodedCommand (base64 UTF-16LE) keeps quotes and newlines intact through vmrun's argv
+        encoded = base64.b64encode(script.encode("utf-16-le")).decode("ascii")
+        # Wait for the script like the server does, so the rc is the script's own; stay in
+        # the interactive session the server runs in (close_window needs the user's desktop)
+        return self.vm.run_in_guest(
+            GUEST_POWERSHELL,
+            ["-NoProfile", "-NonInteractive", "-ExecutionPolicy", "Bypass", "-EncodedCommand", encoded],
+            interactive=True, nowait=False, timeout=timeout
+        )
+    
+    def invoke(self, script: str, timeout: int = 60) -> int:
+        """Run a PowerShell script in the guest, wait for it and return its exit code."""
+        with self._lock:
+            if not self._disabled and self._sock is None and not self._start_server():
+                logger.info("Persistent PowerShell session unavailable, using powershell.exe per command")
+                self._disabled = True
+            if self._disabled:
+                return self._fallback(script, timeout)
+            
+            request = json.dumps({"token": self._token, "script": script}) + "\n"
+            try:
+                self._sock.settimeout(timeout)
+                self._sock.sendall(request.encode("utf-8"))
+            except OSError as e:
+                # Nothing was run yet, so it is safe to retry via powershell.exe
+                logger.warning(f"PowerShell session send failed, falling back: {e}")
+                self._close_locked()
+                self._disabled = True
+                return self._fallback(script, timeout)
+            
+            try:
+                line = self._reader.readline()
+                if not line:
+                    raise OSError("connection closed by guest")
+                response = json.loads(line)
+            except (OSError, ValueError) as e:
+                # The script may have run; do not replay it
+                logger.error(f"PowerShell session lost while running command: {e}")
+                self._close_locked()
+                self._disabled = True
+                return -1
+        
+        stdout = response.get("stdout") or ""
+        stderr = response.get("stderr") or ""
+        if stdout.strip():
+            logger.debug("Guest stdout: %s", stdout)
+        if stderr.strip():
+            logger.debug("Guest stderr: %s", stderr)
+        return int(response.get("rc", 1))
+    
+    def _close_locked(self) -> None:
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._reader = None
+    
+    def close(self) -> None:
+        """Stop the guest server and close the connection to it.
+        
+        A server that was started but never reached exits on its own after its
+        idle timeout.
+        """
+        with self._lock:
+            if self._sock is not None:
+                try:
+                    self._sock.settimeout(2)
+                    self._sock.sendall((json.dumps({"token": self._token, "shutdown": True}) + "\n").encode("utf-8"))
+                except OSError as e:
+                    logger.debug(f"Could not ask the guest PowerShell server to stop: {e}")
+            self._close_locked()
@@ -5,35 +5,122 @@ This script runs inside the VM to evaluate task completion.
 """
 
 import argparse
+import atexit
+import functools
+import itertools
 import json
 import sys
 import os
 import re
 import subprocess
+import threading
 import requests
 import time
-from pathlib import Path
-from typing import Dict, Any, List, Union
+from typing import Callable, Dict, Any, List, Union
 import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+# orjson is optional: it parses and serializes large task blobs several times faster
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('C:\\evaluators\\eval.log'),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
 
+class BufferedFileHandler(logging.FileHandler):
+    """FileHandler that skips the flush logging does after every record.
+    
+    ERROR and above are still flushed at once; other records reach eval.log when
+    the stream buffer fills or when logging.shutdown() closes the handler at exit.
+    """
+    
+    def emit(self, record: logging.LogRecord) -> None:
+        self._flush_now = record.levelno >= logging.ERROR
+        super().emit(record)
+    
+    def flush(self) -> None:
+        if getattr(self, "_flush_now", True):
+            super().flush()
+    
+    def close(self) -> None:
+        self._flush_now = True
+        super().close()
+
+
+def setup_logging() -> None:
+    """Configure logging once arguments are parsed.
+    
+    Evaluators only enqueue records; a listener thread writes them to eval.log,
+    which is opened on first write, buffered, and drained when the process exits.
+    """
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    # stderr is redirected to the per-task _eval.err, so keep the console handler
+    handlers = [BufferedFileHandler('C:\\evaluators\\eval.log', delay=True),
+                logging.StreamHandler()]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    # The queue side passes the bare message on; the listener's handlers format it
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.setFormatter(logging.Formatter('%(message)s'))
+    logging.basicConfig(level=logging.INFO, handlers=[queue_handler])
+    listener.start()
+    atexit.register(listener.stop)
+
+
+@functools.lru_cache(maxsize=512)
+def _to_windows_path(path: str) -> str:
+    """Translate an OSWorld Linux path (/home/user/...) to the Windows guest layout."""
+    return path.replace('/home/user/', 'C:\\Users\\user\\').replace('/', '\\')
+
+
+# Connections reused across DevTools calls within one evaluator run
+_HTTP = requests.Session()
+_WS_POOL: Dict[str, Any] = {}
+_devtools_ids = itertools.count(1)
+
+
+def _close_devtools_connections() -> None:
+    """Close pooled DevTools websockets."""
+    for ws in _WS_POOL.values():
+        try:
+            ws.close()
+        except Exception:
+            pass
+    _WS_POOL.clear()
+
+
+atexit.register(_close_devtools_connections)
+
+
+# Last /json answer as (monotonic timestamp, targets); targets rarely change within one run
+_TARGETS_TTL = 2.0
+_targets_cache = None
+
+
+def _invalidate_targets() -> None:
+    """Drop the cached DevTools target list so the next lookup asks Chrome again."""
+    global _targets_cache
+    _targets_cache = None
+
+
 def get_chrome_devtools_targets() -> List[Dict[str, Any]]:
-    """Get Chrome DevTools targets via debugging port."""
+    """Get Chrome DevTools targets via debugging port, reusing an answer younger than _TARGETS_TTL."""
+    global _targets_cache
+    if _targets_cache is not None and time.monotonic() - _targets_cache[0] < _TARGETS_TTL:
+        return _targets_cache[1]
     try:
-        response = requests.get('http://localhost:1337/json', timeout=5)
+        response = _HTTP.get('http://localhost:1337/json', timeout=5)
         if response.status_code == 200:
-            return response.json()
+            targets = response.json()
+            _targets_cache = (time.monotonic(), targets)
+            return targets
         else:
             logger.warning(f"Chrome DevTools returned status {response.status_code}")
             return []
@@ -42,21 +129,79 @@ def get_chrome_devtools_targets() -> List[Dict[str, Any]]:
         return []
 
 
-def execute_chrome_devtools_command(target_id: str, command: Dict[str, Any]) -> Dict[str, Any]:
-    """Execute a Chrome DevTools command."""
-    try:
+def _get_devtools_socket(target_id: str):
+    """Return a connected websocket for target_id, opening one if needed."""
+    ws = _WS_POOL.get(target_id)
+    if ws is None or not ws.connected:
         import websocket
-        ws_url = f"ws://localhost:1337/devtools/page/{target_id}"
-        ws = websocket.create_connection(ws_url, timeout=10)
-        
-        ws.send(json.dumps(command))
-        result = json.loads(ws.recv())
-        ws.close()
-        
-        return result
-    except Exception as e:
-        logger.error(f"Chrome DevTools command failed: {e}")
-        return {"error": str(e)}
+        ws = websocket.create_connection(f"ws://localhost:1337/devtools/page/{target_id}", timeout=10)
+        _WS_POOL[target_id] = ws
+    return ws
+
+
+def _devtools_payload(msg_id: int, command: Union[str, Dict[str, Any]]) -> str:
+    """Serialize command with msg_id; a str command is a pre-serialized JSON object without an id.
+    
+    The id is an int, so splicing it in as text cannot break the JSON.
+    """
+    body = command if isinstance(command, str) else json.dumps(command)
+    return '{"id":%d,%s' % (msg_id, body[1:])
+
+
+def execute_chrome_devtools_commands(target_id: str, commands: List[Union[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Execute several Chrome DevTools commands on one target in a single round trip.
+    
+    Commands are dicts or pre-serialized JSON strings (see _DO_NOT_TRACK_COMMAND). All
+    commands are sent before any reply is read; replies are matched back by id and
+    returned in the order of commands.
+    """
+    # Unique ids let replies be matched to requests on a shared connection
+    ids = [next(_devtools_ids) for _ in commands]
+    payloads = [_devtools_payload(msg_id, command) for msg_id, command in zip(ids, commands)]
+    last_error = None
+    # A pooled socket may have been closed by Chrome; reconnect once before giving up
+    for _ in range(2):
+        try:
+            ws = _get_devtools_socket(target_id)
+            for payload in payloads:
+                ws.send(payload)
+            pending = set(ids)
+            replies = {}
+            while pending:
+                reply = json.loads(ws.recv())
+                reply_id = reply.get("id")
+                # Anything else is an event or a stale reply; keep reading
+                if reply_id in pending:
+                    pending.discard(reply_id)
+                    replies[reply_id] = reply
+            return [replies[msg_id] for msg_id in ids]
+        except Exception as e:
+            last_error = e
+            stale = _WS_POOL.pop(target_id, None)
+            if stale is not None:
+                try:
+                    stale.close()
+                except Exception:
+                    pass
+    
+    # The target may have gone away; make the next lookup fetch a fresh list
+    _invalidate_targets()
+    logger.error(f"Chrome DevTools command failed: {last_error}")
+    return [{"error": str(last_error)} for _ in commands]
+
+
+def execute_chrome_devtools_command(target_id: str, command: Union[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Execute a Chrome DevTools command over a pooled websocket."""
+    return execute_chrome_devtools_commands(target_id, [command])[0]
+
+
+# Static DevTools probe, serialized once; only the message id is spliced in per send
+_DO_NOT_TRACK_COMMAND = json.dumps({
+    "method": "Runtime.evaluate",
+    "params": {
+        "expression": "navigator.doNotTrack === '1' || navigator.doNotTrack === 'yes'"
+    }
+})
 
 
 def check_chrome_do_not_track() -> bool:
@@ -71,15 +216,7 @@ def check_chrome_do_not_track() -> bool:
         target_id = target['id']
         
         # Execute JavaScript to check Do Not Track setting
-        command = {
-            "id": 1,
-            "method": "Runtime.evaluate",
-            "params": {
-                "expression": "navigator.doNotTrack === '1' || navigator.doNotTrack === 'yes'"
-            }
-        }
-        
-        result = execute_chrome_devtools_command(target_id, command)
+        result = execute_chrome_devtools_command(target_id, _DO_NOT_TRACK_COMMAND)
         
         if "result" in result and "result" in result["result"]:
             return result["result"]["result"]["value"] == True
@@ -115,10 +252,10 @@ def exact_match_evaluator(task: Dict[str, Any]) -> Dict[str, Any]:
     Enhanced exact_match evaluator with Chrome DevTools integration.
     """
     try:
-        evaluator = task.get('evaluator', {})
-        expected = evaluator.get('expected', {})
-        result_config = evaluator.get('result', {})
-        rules = expected.get('rules', {})
+        evaluator = task.get('evaluator') or {}
+        expected = evaluator.get('expected') or {}
+        result_config = evaluator.get('result') or {}
+        rules = expected.get('rules') or {}
         expected_value = rules.get('expected', '')
         
         result_type = result_config.get('type', '')
@@ -192,7 +329,6 @@ def chrome_evaluator(task: Dict[str, Any], func_name: str) -> Dict[str, Any]:
         if func_name == 'is_expected_tabs':
             # Check if expected tabs are open
             tabs = check_chrome_tabs()
-            expected = task.get('evaluator', {}).get('expected', {})
             
             return {
                 "passed": len(tabs) > 0,  # Simplified check
@@ -242,17 +378,17 @@ def file_evaluator(task: Dict[str, Any], func_name: str) -> Dict[str, Any]:
     File-related evaluators with actual file system checks.
     """
     try:
-        evaluator = task.get('evaluator', {})
-        result_config = evaluator.get('result', {})
-        expected_config = evaluator.get('expected', {})
+        evaluator = task.get('evaluator') or {}
+        result_config = evaluator.get('result') or {}
+        expected_config = evaluator.get('expected') or {}
         
         if func_name == 'compare_table' or func_name == 'compare_docx_tables':
             # Compare document tables (simplified)
             result_path = result_config.get('path', '')
             if result_path:
                 # Convert Linux path to Windows
-                windows_path = result_path.replace('/home/user/', 'C:\\Users\\user\\').replace('/', '\\')
-                file_exists = Path(windows_path).exists()
+                windows_path = _to_windows_path(result_path)
+                file_exists = os.path.exists(windows_path)
                 
                 return {
                     "passed": file_exists,
@@ -299,11 +435,12 @@ def system_evaluator(task: Dict[str, Any], func_name: str) -> Dict[str, Any]:
     System-related evaluators for OS operations.
     """
     try:
+        evaluator = task.get('evaluator') or {}
+        result_config = evaluator.get('result') or {}
+        rules = (evaluator.get('expected') or {}).get('rules') or {}
+        
         if func_name == 'check_include_exclude':
             # Check terminal output for include/exclude patterns
-            evaluator = task.get('evaluator', {})
-            expected = evaluator.get('expected', {})
-            rules = expected.get('rules', {})
             include_patterns = rules.get('include', [])
             exclude_patterns = rules.get('exclude', [])
             
@@ -323,13 +460,11 @@ def system_evaluator(task: Dict[str, Any], func_name: str) -> Dict[str, Any]:
         
         elif func_name == 'check_thunderbird_prefs':
             # Check Thunderbird preferences
-            evaluator = task.get('evaluator', {})
-            result_config = evaluator.get('result', {})
             file_path = result_config.get('path', '')
             
             if file_path:
-                windows_path = file_path.replace('/home/user/', 'C:\\Users\\user\\').replace('/', '\\')
-                file_exists = Path(windows_path).exists()
+                windows_path = _to_windows_path(file_path)
+                file_exists = os.path.exists(windows_path)
                 
                 return {
                     "passed": file_exists,
@@ -353,22 +488,41 @@ def system_evaluator(task: Dict[str, Any], func_name: str) -> Dict[str, Any]:
         
         elif func_name == 'is_extension_installed':
             # Check if VS Code extension is installed
-            evaluator = task.get('evaluator', {})
-            result_config = evaluator.get('result', {})
             command = result_config.get('command', [])
             
             if command:
                 try:
-                    # Execute the command to check extension
-                    result = subprocess.run(command, capture_output=True, text=True, timeout=30)
-                    output = result.stdout.strip()
-                    
-                    # Check if expected extension is in output
-                    expected = evaluator.get('expected', {})
-                    rules = expected.get('rules', {})
                     expected_ext = rules.get('expected', '')
                     
-                    passed = expected_ext in output
+                    # Stream the command output and stop at the first matching line,
+                    # keeping only the head of the output for the details
+                    proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                            text=True, bufsize=64 * 1024)
+                    timed_out = threading.Event()
+                    
+                    def _kill_on_timeout():
+                        timed_out.set()
+                        proc.kill()
+                    
+                    watchdog = threading.Timer(30, _kill_on_timeout)
+                    watchdog.start()
+                    passed = not expected_ext
+                    collected = []
+                    try:
+                        for line in proc.stdout:
+                            if len(collected) < 20:
+                                collected.append(line.rstrip())
+                            if expected_ext and expected_ext in line:
+                                passed = True
+                                proc.terminate()
+                                break
+                        proc.stdout.close()
+                        proc.wait(timeout=30)
+                    finally:
+                        watchdog.cancel()
+                    if timed_out.is_set() and not passed:
+                        raise subprocess.TimeoutExpired(command, 30)
+                    output = '\n'.join(collected).strip()
                     
                     return {
                         "passed": passed,
@@ -458,17 +612,18 @@ def evaluate_task(task: Dict[str, Any]) -> Dict[str, Any]:
         
         # Handle multiple functions (array)
         if isinstance(func, list):
+            # Stop as soon as the conjunction is decided: the first failure under
+            # 'and', the first pass under 'or'
+            conj = evaluator.get('conj', 'and')
+            short_circuit_on = conj == 'or'
             results = []
+            overall_passed = not short_circuit_on
             for f in func:
                 result = evaluate_single_function(task, f)
                 results.append(result)
-            
-            # Determine overall result based on conjunction
-            conj = evaluator.get('conj', 'and')
-            if conj == 'or':
-                overall_passed = any(r['passed'] for r in results)
-            else:  # 'and' or default
-                overall_passed = all(r['passed'] for r in results)
+                if bool(result['passed']) == short_circuit_on:
+                    overall_passed = short_circuit_on
+                    break
             
             return {
                 "passed": overall_passed,
@@ -494,31 +649,61 @@ def evaluate_task(task: Dict[str, Any]) -> Dict[str, Any]:
         }
 
 
-def evaluate_single_function(task: Dict[str, Any], func: str) -> Dict[str, Any]:
-    """Evaluate a single function."""
-    # Route to appropriate evaluator based on function name
-    if func == 'exact_match':
-        return exact_match_evaluator(task)
-    
+# Evaluator lookup tables, built once: known function names first, then the
+# "<family>." prefix of namespaced names such as "chrome.open_tabs"
+_EVALUATORS_BY_NAME: Dict[str, Callable[[Dict[str, Any], str], Dict[str, Any]]] = {
+    'exact_match': lambda task, func: exact_match_evaluator(task),
     # Chrome-related functions
-    elif func in ['is_expected_tabs', 'enable_do_not_track', 'compare_pdfs'] or func.startswith('chrome.'):
-        return chrome_evaluator(task, func)
-    
+    **dict.fromkeys(['is_expected_tabs', 'enable_do_not_track', 'compare_pdfs'], chrome_evaluator),
     # File-related functions
-    elif func in ['compare_table', 'compare_docx_tables', 'compare_line_spacing', 'compare_pptx_files'] or func.startswith('file.'):
-        return file_evaluator(task, func)
-    
+    **dict.fromkeys(['compare_table', 'compare_docx_tables', 'compare_line_spacing', 'compare_pptx_files'], file_evaluator),
     # System-related functions
-    elif func in ['check_include_exclude', 'check_thunderbird_prefs', 'check_qt_bgcone', 'is_extension_installed'] or func.startswith('system.'):
-        return system_evaluator(task, func)
-    
+    **dict.fromkeys(['check_include_exclude', 'check_thunderbird_prefs', 'check_qt_bgcone', 'is_extension_installed'], system_evaluator),
     # Generic functions
-    elif func in ['infeasible'] or func.startswith('generic.'):
-        return generic_evaluator(task, func)
-    
-    else:
+    'infeasible': generic_evaluator,
+}
+
+_EVALUATORS_BY_PREFIX: Dict[str, Callable[[Dict[str, Any], str], Dict[str, Any]]] = {
+    'chrome': chrome_evaluator,
+    'file': file_evaluator,
+    'system': system_evaluator,
+    'generic': generic_evaluator,
+}
+
+
+def evaluate_single_function(task: Dict[str, Any], func: str) -> Dict[str, Any]:
+    """Evaluate a single function."""
+    # Route to appropriate evaluator based on function name
+    evaluator = _EVALUATORS_BY_NAME.get(func)
+    if evaluator is None:
+        prefix, dot, _ = func.partition('.')
+        evaluator = _EVALUATORS_BY_PREFIX.get(prefix) if dot else None
+    if evaluator is None:
         logger.warning(f"Unknown evaluator function: {func}, using generic evaluator")
-        return generic_evaluator(task, func)
+        evaluator = generic_evaluator
+    return evaluator(task, func)
+
+
+def load_task_file(path: str) -> Dict[str, Any]:
+    """Read a task JSON file."""
+    if ORJSON_AVAILABLE:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_result_file(path: str, result: Dict[str, Any]) -> None:
+    """Write a result JSON file atomically so the host never copies a partial file."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    if ORJSON_AVAILABLE:
+        with open(tmp_path, 'wb') as f:
+            f.write(orjson.dumps(result, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
 
 
 def main():
@@ -528,18 +713,17 @@ def main():
     parser.add_argument('--out', required=True, help='Path to output result JSON file')
     
     args = parser.parse_args()
+    setup_logging()
     
     try:
         logger.info(f"Starting evaluation of task: {args.task}")
         logger.info(f"Output will be written to: {args.out}")
         
         # Read task file
-        task_path = Path(args.task)
-        if not task_path.exists():
+        if not os.path.isfile(args.task):
             raise FileNotFoundError(f"Task file not found: {args.task}")
         
-        with open(task_path, 'r', encoding='utf-8') as f:
-            task = json.load(f)
+        task = load_task_file(args.task)
         
         logger.info(f"Loaded task: {task.get('id', 'unknown')}")
         
@@ -551,11 +735,7 @@ def main():
         result['timestamp'] = str(int(time.time()))
         
         # Write result
-        output_path = Path(args.out)
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(result, f, indent=2, ensure_ascii=False)
+        write_result_file(args.out, result)
         
         logger.info(f"Evaluation completed. Result: {'PASSED' if result['passed'] else 'FAILED'}")
         logger.info(f"Result written to: {args.out}")
@@ -578,10 +758,7 @@ def main():
         }
         
         try:
-            output_path = Path(args.out)
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(error_result, f, indent=2, ensure_ascii=False)
+            write_result_file(args.out, error_result)
         except Exception as write_error:
             logger.error(f"Could not write error result: {write_error}")
         
@@ -6,39 +6,108 @@ by interpreting the action parameters and executing appropriate commands.
 """
 
 import argparse
+import atexit
+import functools
 import json
+import os
+import re
+import shutil
 import sys
 import subprocess
 import logging
-from pathlib import Path
-from typing import Dict, Any
-
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('C:\\evaluators\\generic_runner.log'),
-        logging.StreamHandler()
-    ]
-)
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Callable, Dict, List, Union
+
 logger = logging.getLogger(__name__)
 
 
+class BufferedFileHandler(logging.FileHandler):
+    """FileHandler that only flushes on ERROR records and on close."""
+    
+    def emit(self, record: logging.LogRecord) -> None:
+        self._flush_now = record.levelno >= logging.ERROR
+        super().emit(record)
+    
+    def flush(self) -> None:
+        if getattr(self, "_flush_now", True):
+            super().flush()
+    
+    def close(self) -> None:
+        self._flush_now = True
+        super().close()
+
+
+def setup_logging() -> None:
+    """Configure logging once arguments are parsed.
+    
+    The runner logs through a queue; a QueueListener owns the (buffered) file and
+    console handlers and is stopped at exit so nothing queued is lost.
+    """
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    handlers = [BufferedFileHandler('C:\\evaluators\\generic_runner.log', delay=True),
+                logging.StreamHandler()]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    # The queue side passes the bare message on; the listener's handlers format it
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.setFormatter(logging.Formatter('%(message)s'))
+    logging.basicConfig(level=logging.INFO, handlers=[queue_handler])
+    listener.start()
+    atexit.register(listener.stop)
+
+
+@functools.lru_cache(maxsize=512)
+def _to_windows_path(path: str) -> str:
+    """Translate an OSWorld Linux path (/home/user/...) to the Windows guest layout."""
+    return path.replace('/home/user/', 'C:\\Users\\user\\').replace('/', '\\')
+
+
+# PowerShell templates for the path/process actions; arguments go through _q
+_PS_OPEN = "Start-Process '{}'"
+_PS_DEL = "Remove-Item '{}' -Force -ErrorAction SilentlyContinue"
+_PS_MKDIR = "New-Item -ItemType Directory -Force -Path '{}'"
+_PS_KILL = "Stop-Process -Name '{}' -Force -ErrorAction SilentlyContinue"
+
+
+def _q(value: str) -> str:
+    """Escape a value for a single-quoted PowerShell literal."""
+    return value.replace("'", "''")
+
+
+# Action type classification, one match per action: a prefix (open*, delete*, ...)
+# or one of the exact names; the named group that matched is the action kind
+_PATH_ACTION_RE = re.compile(r'(?P<open>open|launch_file\Z)|(?P<delete>delete|remove\Z)|(?P<create>create|mkdir\Z)')
+_PROCESS_ACTION_RE = re.compile(r'(?P<stop>kill|stop)|(?P<start>start|launch)')
+
+
+def _action_kind(pattern: "re.Pattern", action_type: str) -> str:
+    """Return the named group of pattern matching the start of action_type, or ''."""
+    match = pattern.match(action_type)
+    return match.lastgroup if match else ""
+
+
+# Command output beyond this many characters is left out of the log
+_LOG_OUTPUT_LIMIT = 1024
+
+
 def execute_powershell_command(command: str) -> int:
     """Execute a PowerShell command and return exit code."""
     try:
         result = subprocess.run(
-            ["powershell.exe", "-Command", command],
+            ["powershell.exe", "-NoProfile", "-NonInteractive", "-Command", command],
             capture_output=True,
             text=True,
             timeout=60
         )
         
-        if result.stdout:
-            logger.info(f"PowerShell output: {result.stdout}")
-        if result.stderr:
-            logger.warning(f"PowerShell error: {result.stderr}")
+        if result.stdout and logger.isEnabledFor(logging.INFO):
+            logger.info("PowerShell output: %s", result.stdout[:_LOG_OUTPUT_LIMIT])
+        if result.stderr and logger.isEnabledFor(logging.WARNING):
+            logger.warning("PowerShell error: %s", result.stderr[:_LOG_OUTPUT_LIMIT])
             
         return result.returncode
     except subprocess.TimeoutExpired:
@@ -49,74 +118,120 @@ def execute_powershell_command(command: str) -> int:
         return 1
 
 
+def execute_command(argv: Union[str, List[str]]) -> int:
+    """Execute a program directly (no PowerShell host) and return exit code."""
+    try:
+        result = subprocess.run(argv, capture_output=True, text=True, timeout=60)
+        
+        if result.stdout and logger.isEnabledFor(logging.INFO):
+            logger.info("Command output: %s", result.stdout[:_LOG_OUTPUT_LIMIT])
+        if result.stderr and logger.isEnabledFor(logging.WARNING):
+            logger.warning("Command error: %s", result.stderr[:_LOG_OUTPUT_LIMIT])
+            
+        return result.returncode
+    except subprocess.TimeoutExpired:
+        logger.error("Command timed out")
+        return 1
+    except Exception as e:
+        logger.error(f"Error executing command: {e}")
+        return 1
+
+
+def _run_shell_command(command: str) -> int:
+    """Run a command string through cmd.exe (no PowerShell host in between).
+    
+    /s /c "..." makes cmd strip exactly the outer quotes, so commands that start
+    with a quoted program path keep their inner quotes.
+    """
+    logger.info("Executing shell command: %s", command)
+    return execute_command(f'cmd.exe /s /c "{command}"')
+
+
+def _run_program(command: Union[List[Any], tuple]) -> int:
+    """Run a program with arguments, resolving it on PATH/PATHEXT like PowerShell's &."""
+    argv = [str(arg) for arg in command]
+    if not argv:
+        logger.warning("Empty command list, nothing to run")
+        return 1
+    # CreateProcess neither searches PATHEXT nor runs batch files, so resolve the
+    # program first and hand .cmd/.bat shims (e.g. code.cmd) to cmd.exe
+    resolved = shutil.which(argv[0]) or argv[0]
+    argv[0] = resolved
+    if os.path.splitext(resolved)[1].lower() in (".cmd", ".bat"):
+        argv = ["cmd.exe", "/c"] + argv
+    logger.info("Executing program: %s", subprocess.list2cmdline(argv))
+    return execute_command(argv)
+
+
+# "command" parameter handlers keyed by the JSON value's exact type
+_COMMAND_HANDLERS: Dict[type, Callable[[Any], int]] = {
+    str: _run_shell_command,
+    list: _run_program,
+    tuple: _run_program,
+}
+
+
 def handle_generic_action(action_data: Dict[str, Any]) -> int:
     """Handle generic action by interpreting parameters and executing commands."""
     action_type = action_data.get("type", "unknown")
     parameters = action_data.get("parameters", {})
     
-    logger.info(f"Handling generic action: {action_type}")
-    logger.info(f"Parameters: {parameters}")
+    logger.info("Handling generic action: %s", action_type)
+    logger.info("Parameters: %s", parameters)
     
     # Try to interpret common parameter patterns
     if "command" in parameters:
         # Action has a command to execute
         command = parameters["command"]
         
-        if isinstance(command, str):
-            # Execute as shell command
-            logger.info(f"Executing shell command: {command}")
-            return execute_powershell_command(f"cmd.exe /c '{command}'")
-        elif isinstance(command, list):
-            # Execute as program with arguments
-            program = command[0]
-            args = " ".join(f'"{arg}"' for arg in command[1:])
-            cmd = f"& '{program}' {args}" if args else f"& '{program}'"
-            logger.info(f"Executing program: {cmd}")
-            return execute_powershell_command(cmd)
+        handler = _COMMAND_HANDLERS.get(type(command))
+        if handler is not None:
+            return handler(command)
     
     elif "script" in parameters:
         # Action has a script to execute
         script = parameters["script"]
-        logger.info(f"Executing script: {script}")
-        return execute_powershell_command(f"& '{script}'")
+        logger.info("Executing script: %s", script)
+        return execute_powershell_command(f"& '{_q(script)}'")
     
     elif "path" in parameters:
         # Action involves a file path
         path = parameters["path"]
         
         # Convert Linux paths to Windows paths
-        windows_path = path.replace("/home/user/", "C:\\Users\\user\\")
-        windows_path = windows_path.replace("/", "\\")
+        windows_path = _to_windows_path(path)
         
-        if action_type.startswith("open") or action_type == "launch_file":
+        kind = _action_kind(_PATH_ACTION_RE, action_type)
+        if kind == "open":
             # Try to open the file
-            logger.info(f"Opening file: {windows_path}")
-            return execute_powershell_command(f"Start-Process '{windows_path}'")
-        elif action_type.startswith("delete") or action_type == "remove":
+            logger.info("Opening file: %s", windows_path)
+            return execute_powershell_command(_PS_OPEN.format(_q(windows_path)))
+        elif kind == "delete":
             # Try to delete the file
-            logger.info(f"Deleting file: {windows_path}")
-            return execute_powershell_command(f"Remove-Item '{windows_path}' -Force -ErrorAction SilentlyContinue")
-        elif action_type.startswith("create") or action_type == "mkdir":
+            logger.info("Deleting file: %s", windows_path)
+            return execute_powershell_command(_PS_DEL.format(_q(windows_path)))
+        elif kind == "create":
             # Try to create directory
-            logger.info(f"Creating directory: {windows_path}")
-            return execute_powershell_command(f"New-Item -ItemType Directory -Force -Path '{windows_path}'")
+            logger.info("Creating directory: %s", windows_path)
+            return execute_powershell_command(_PS_MKDIR.format(_q(windows_path)))
     
     elif "url" in parameters:
         # Action involves a URL
         url = parameters["url"]
-        logger.info(f"Opening URL: {url}")
-        return execute_powershell_command(f"Start-Process '{url}'")
+        logger.info("Opening URL: %s", url)
+        return execute_powershell_command(_PS_OPEN.format(_q(url)))
     
     elif "process" in parameters or "name" in parameters:
         # Action involves process management
         process_name = parameters.get("process") or parameters.get("name")
         
-        if action_type.startswith("kill") or action_type.startswith("stop"):
-            logger.info(f"Stopping process: {process_name}")
-            return execute_powershell_command(f"Stop-Process -Name '{process_name}' -Force -ErrorAction SilentlyContinue")
-        elif action_type.startswith("start") or action_type.startswith("launch"):
-            logger.info(f"Starting process: {process_name}")
-            return execute_powershell_command(f"Start-Process '{process_name}'")
+        kind = _action_kind(_PROCESS_ACTION_RE, action_type)
+        if kind == "stop":
+            logger.info("Stopping process: %s", process_name)
+            return execute_powershell_command(_PS_KILL.format(_q(process_name)))
+        elif kind == "start":
+            logger.info("Starting process: %s", process_name)
+            return execute_powershell_command(_PS_OPEN.format(_q(process_name)))
     
     elif "registry" in parameters or "reg" in parameters:
         # Action involves registry operations
@@ -127,14 +242,14 @@ def handle_generic_action(action_data: Dict[str, Any]) -> int:
             data = reg_data.get("data", "")
             
             if key and value:
-                logger.info(f"Setting registry value: {key}\\{value} = {data}")
+                logger.info("Setting registry value: %s\\%s = %s", key, value, data)
                 cmd = f"Set-ItemProperty -Path 'Registry::{key}' -Name '{value}' -Value '{data}' -ErrorAction SilentlyContinue"
                 return execute_powershell_command(cmd)
     
     # If we can't interpret the action, try to execute it as a generic command
     # Convert the entire action to a JSON string and log it
     action_json = json.dumps(action_data, indent=2)
-    logger.warning(f"Could not interpret action type '{action_type}', logging parameters:")
+    logger.warning("Could not interpret action type '%s', logging parameters:", action_type)
     logger.warning(action_json)
     
     # Try to find any executable content in the parameters
@@ -146,11 +261,11 @@ def handle_generic_action(action_data: Dict[str, Any]) -> int:
             value.startswith("cmd") or
             value.startswith("powershell")
         ):
-            logger.info(f"Found executable in parameter '{key}': {value}")
+            logger.info("Found executable in parameter '%s': %s", key, value)
             return execute_powershell_command(value)
     
     # Last resort: create a simple log entry and return success
-    logger.info(f"Generic action '{action_type}' processed (no specific handler available)")
+    logger.info("Generic action '%s' processed (no specific handler available)", action_type)
     return 0
 
 
@@ -160,16 +275,16 @@ def main():
     parser.add_argument('--action', required=True, help='Path to action JSON file')
     
     args = parser.parse_args()
+    setup_logging()
     
     try:
         logger.info(f"Starting generic action runner for: {args.action}")
         
         # Read action file
-        action_path = Path(args.action)
-        if not action_path.exists():
+        if not os.path.isfile(args.action):
             raise FileNotFoundError(f"Action file not found: {args.action}")
         
-        with open(action_path, 'r', encoding='utf-8') as f:
+        with open(args.action, 'r', encoding='utf-8') as f:
             action_data = json.load(f)
         
         logger.info(f"Loaded action: {action_data.get('type', 'unknown')}")
@@ -0,0 +1,94 @@
+# Persistent PowerShell host for the Annotator Kit, run inside the guest VM.
+# Accepts line-delimited JSON requests {"token": ..., "script": ...} over TCP and
+# answers each with {"rc": ..., "stdout": ..., "stderr": ...}. Commands skip the
+# powershell.exe startup cost, but each one gets a fresh runspace so variables,
+# preferences and the current location never leak from one action to the next.
+# A request {"token": ..., "shutdown": true} stops the server; it also exits on its
+# own after IdleTimeoutSeconds without a client (e.g. when the host never reaches it).
+#
+# The listener binds every guest interface and the token travels in cleartext:
+# only enable this (config: persistent_ps_session) on an isolated host-only/NAT
+# VM network, with a guest firewall rule allowing the port range 47800-48799.
+param(
+    [Parameter(Mandatory=$true)]
+    [int]$Port,
+
+    [Parameter(Mandatory=$true)]
+    [string]$Token,
+
+    [int]$IdleTimeoutSeconds = 600
+)
+
+$ErrorActionPreference = 'Continue'
+$ProgressPreference = 'SilentlyContinue'
+
+function Invoke-Request {
+    param([string]$Script)
+
+    $runspace = [runspacefactory]::CreateRunspace()
+    $runspace.Open()
+    $ps = [powershell]::Create()
+    $ps.Runspace = $runspace
+    $rc = 0
+    $stdout = ''
+    $stderr = ''
+    try {
+        [void]$ps.AddScript('$global:LASTEXITCODE = 0').AddStatement()
+        [void]$ps.AddScript($Script).AddCommand('Out-String')
+        $stdout = ($ps.Invoke() -join '')
+        $info = $ps.Streams.Information | ForEach-Object { $_.ToString() }
+        if ($info) { $stdout = (($info -join "`n") + "`n" + $stdout) }
+        $stderr = ($ps.Streams.Error | Out-String)
+        $hadErrors = $ps.HadErrors
+        $ps.Commands.Clear()
+        $last = $ps.AddScript('$global:LASTEXITCODE').Invoke()
+        if ($last -and $last[0] -ne 0) { $rc = [int]$last[0] }
+        elseif ($hadErrors) { $rc = 1 }
+    } catch {
+        $rc = 1
+        $stderr = $_.Exception.Message
+    } finally {
+        $ps.Dispose()
+        $runspace.Dispose()
+    }
+    return @{ rc = $rc; stdout = $stdout; stderr = $stderr }
+}
+
+$listener = [System.Net.Sockets.TcpListener]::new([System.Net.IPAddress]::Any, $Port)
+$listener.Start()
+Write-Host ('PS_SERVER_READY PORT=' + $Port)
+
+$utf8 = New-Object System.Text.UTF8Encoding($false)
+$running = $true
+while ($running) {
+    $accept = $listener.AcceptTcpClientAsync()
+    if (-not $accept.Wait($IdleTimeoutSeconds * 1000)) {
+        Write-Host 'Idle timeout, stopping'
+        break
+    }
+    $client = $accept.Result
+    try {
+        $stream = $client.GetStream()
+        $reader = New-Object System.IO.StreamReader($stream, $utf8)
+        $writer = New-Object System.IO.StreamWriter($stream, $utf8)
+        $writer.AutoFlush = $true
+        while ($null -ne ($line = $reader.ReadLine())) {
+            $req = $line | ConvertFrom-Json
+            if ($req.token -ne $Token) {
+                $writer.WriteLine((@{ rc = 401; stdout = ''; stderr = 'invalid token' } | ConvertTo-Json -Compress))
+                break
+            }
+            if ($req.shutdown) {
+                $running = $false
+                break
+            }
+            $resp = Invoke-Request -Script $req.script
+            $writer.WriteLine(($resp | ConvertTo-Json -Compress))
+        }
+    } catch {
+        Write-Host ('Client error: ' + $_)
+    } finally {
+        $client.Close()
+    }
+}
+$listener.Stop()
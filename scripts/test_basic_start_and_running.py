@@ -1,7 +1,7 @@
 import subprocess
 import time
-import shlex
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 VMRUN = r"C:\Program Files (x86)\VMware\VMware Workstation\vmrun.exe"
 VMX   = r"E:\Virtual Machines\Windows 11 x64\Windows 11 x64 (2).vmx"
@@ -12,36 +12,45 @@ GUEST_PASS = "password"
 
 VM_ENCRYPT_PASS = os.environ.get("VM_VMX_PASSWORD")
 
-def run(cmd):
+# VMRUN_VERBOSE=0 时 run() 不再回显命令和输出（也就不再解码输出），只在失败时打印 stderr
+VERBOSE = os.environ.get("VMRUN_VERBOSE", "1") != "0"
+
+# 所有 vmrun 调用共用的 subprocess 参数：不分配控制台窗口（仅 Windows 有此标志）、
+# 不继承句柄、不继承标准输入
+_POPEN_KW = dict(creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
+                 close_fds=True, stdin=subprocess.DEVNULL)
+
+def _decode(b):
+    # vmrun 的输出使用系统代码页（中文系统上为 GBK），先按 mbcs 解码，失败再退回 UTF-8
+    try:
+        return b.decode("mbcs")
+    except (LookupError, UnicodeDecodeError):
+        return b.decode("utf-8", "replace")
+
+def run(cmd, check=True):
     # 小工具：同步执行并打印输出，便于调试
-    print(">", " ".join(f'"{arg}"' if " " in arg else arg for arg in cmd))
-    print("Debug - Raw command list:", cmd)
+    # check=False 时不抛异常，由调用方根据 returncode 自行判断（用于预期内的失败）
+    if VERBOSE:
+        print(">", " ".join(f'"{arg}"' if " " in arg else arg for arg in cmd))
+        print("Debug - Raw command list:", cmd)
     
-    # 尝试多种编码方式来正确显示中文错误信息
-    encodings_to_try = ["utf-8", "gbk", "gb2312", "mbcs"]
-    result = None
+    # 只捕获一次原始字节，需要打印时再解码
+    result = subprocess.run(cmd, capture_output=True, **_POPEN_KW)
     
-    # for encoding in encodings_to_try:
-    #     try:
-    #         result = subprocess.run(cmd, capture_output=True, text=True, encoding=encoding, errors="replace")
-    #         # 检查输出是否包含可读的中文字符
-    #         if result.stdout and not any(ord(c) > 65535 for c in result.stdout):
-    #             break
-    #         if result.stderr and not any(ord(c) > 65535 for c in result.stderr):
-    #             break
-    #     except:
-    #         continue
-    
-    # if result is None:
-    #     # 如果所有编码都失败，使用默认的mbcs
-    result = subprocess.run(cmd, capture_output=True, text=True, encoding="mbcs", errors="replace")
-    
-    if result.stdout:
-        print("STDOUT:", result.stdout.strip())
-    if result.stderr:
-        print("STDERR:", result.stderr.strip())
-    print("Return code:", result.returncode)
-    result.check_returncode()
+    if VERBOSE:
+        if result.stdout:
+            print("STDOUT:", _decode(result.stdout).strip())
+        if result.stderr:
+            print("STDERR:", _decode(result.stderr).strip())
+        print("Return code:", result.returncode)
+    elif result.returncode != 0:
+        # vmrun 把 "Error: ..." 写到 stdout，失败时两者都打印
+        if result.stdout:
+            print("STDOUT:", _decode(result.stdout).strip())
+        if result.stderr:
+            print("STDERR:", _decode(result.stderr).strip())
+    if check and result.returncode != 0:
+        raise subprocess.CalledProcessError(result.returncode, cmd, result.stdout, result.stderr)
     return result
 
 def start_vm(gui=False):
@@ -52,22 +61,36 @@ def start_vm(gui=False):
         args.append("nogui")
     if VM_ENCRYPT_PASS:
         args += ["-vp", VM_ENCRYPT_PASS]
-    run(args)
+    # VM 已在运行时 vmrun 返回 -1（无符号 32 位为 4294967295），这是预期内的，直接继续
+    result = run(args, check=False)
+    if result.returncode == 4294967295:
+        print("VM start returned -1; this usually means the VM is already running, continuing...")
+    elif result.returncode != 0:
+        raise subprocess.CalledProcessError(result.returncode, args, result.stdout, result.stderr)
+    return result
 
 def wait_for_tools(timeout=300):
     # 等待 VMware Tools 运行就绪（来宾系统基本可用）
-    # 简单轮询：checkToolsState -> 'running' 表示就绪
-    t0 = time.time()
+    # 轮询 checkToolsState -> 'running' 表示就绪；间隔从 0.5 秒开始逐步加长到 3 秒，
+    # 这样 Tools 很快就绪时不用白等一个完整的 3 秒周期
+    deadline = time.monotonic() + timeout
+    delay = 0.5
     while True:
-        out = subprocess.run([VMRUN, "-T", "ws", "checkToolsState", VMX],
-                             capture_output=True, text=True)
-        state = (out.stdout or out.stderr or "").strip().lower()
+        try:
+            out = subprocess.run([VMRUN, "-T", "ws", "checkToolsState", VMX],
+                                 capture_output=True, text=True, timeout=30,
+                                 **_POPEN_KW)
+            state = (out.stdout or out.stderr or "").strip().lower()
+        except subprocess.TimeoutExpired:
+            state = ""
         if "running" in state:
             print("VMware Tools is running.")
             return True
-        if time.time() - t0 > timeout:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
             raise TimeoutError("Waited too long for VMware Tools.")
-        time.sleep(3)
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 1.5, 3.0)
 
 def run_in_guest(program, args=None, interactive=False, nowait=True):
     # 在来宾内启动程序（需要 VMware Tools + 来宾凭证）
@@ -85,20 +108,53 @@ def run_in_guest(program, args=None, interactive=False, nowait=True):
         cmd += args
     run(cmd)
 
+def run_many_in_guest(specs, max_workers=4):
+    # 并行启动多个互不依赖的来宾程序，每个 spec 为 (program, args, interactive, nowait)
+    # 返回与 specs 顺序一致的列表：成功为 None，失败为对应的异常
+    def launch(spec):
+        program, args, interactive, nowait = spec
+        try:
+            run_in_guest(program, args, interactive=interactive, nowait=nowait)
+            return None
+        except subprocess.CalledProcessError as e:
+            return e
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(launch, specs))
+
 def copy_host_to_guest(host_path, guest_path):
     run([VMRUN, "-T", "ws",
          "-gu", GUEST_USER, "-gp", GUEST_PASS,
          "copyFileFromHostToGuest", VMX, host_path, guest_path])
 
+# check_interactive_session 的最近一次结果 (time.monotonic(), 结果)，SESSION_CACHE_TTL 秒内直接复用，
+# 避免连续两次探测各启动一次 vmrun listProcessesInGuest
+SESSION_CACHE_TTL = 2.0
+_session_cache = None
+
+def invalidate_session_cache():
+    """会话状态可能已改变（例如刚强制登录）时调用，下一次检查会重新探测"""
+    global _session_cache
+    _session_cache = None
+
 def check_interactive_session():
     """检查是否有用户交互式登录"""
+    global _session_cache
+    if _session_cache is not None and time.monotonic() - _session_cache[0] < SESSION_CACHE_TTL:
+        return _session_cache[1]
+    has_session = _probe_interactive_session()
+    _session_cache = (time.monotonic(), has_session)
+    return has_session
+
+def _probe_interactive_session():
+    """实际执行一次 listProcessesInGuest 探测"""
     print("Checking for interactive user session...")
     try:
         # 尝试列出来宾中的进程，这需要交互式会话
         result = subprocess.run([VMRUN, "-T", "ws", 
                                "-gu", GUEST_USER, "-gp", GUEST_PASS,
                                "listProcessesInGuest", VMX], 
-                              capture_output=True, text=True, encoding="mbcs", errors="replace")
+                              capture_output=True, text=True, encoding="mbcs", errors="replace",
+                              **_POPEN_KW)
         if result.returncode == 0:
             print("Interactive session detected!")
             return True
@@ -109,6 +165,27 @@ def check_interactive_session():
         print(f"Error checking interactive session: {e}")
         return False
 
+# 等待交互式会话的总时长（秒），可用环境变量 VM_LOGIN_TIMEOUT 调整（例如 CI 中缩短）
+LOGIN_TIMEOUT = float(os.environ.get("VM_LOGIN_TIMEOUT", "180"))
+
+def wait_for_interactive_session(timeout=None):
+    """轮询交互式会话，一旦检测到就返回 True，而不是固定等待整个 timeout
+
+    探测间隔按斐波那契数列增长（2, 3, 5, 8, 13 秒），最长 21 秒
+    """
+    if timeout is None:
+        timeout = LOGIN_TIMEOUT
+    deadline = time.monotonic() + timeout
+    delay, next_delay = 2, 3
+    while True:
+        if check_interactive_session():
+            return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(delay, remaining))
+        delay, next_delay = next_delay, min(delay + next_delay, 21)
+
 def force_interactive_login():
     """强制进行交互式登录"""
     print("Attempting to force interactive login...")
@@ -116,7 +193,8 @@ def force_interactive_login():
         # 方法1: 使用loginInGuest命令
         result = subprocess.run([VMRUN, "-T", "ws",
                                "loginInGuest", VMX, GUEST_USER, GUEST_PASS], 
-                              capture_output=True, text=True, encoding="mbcs", errors="replace")
+                              capture_output=True, text=True, encoding="mbcs", errors="replace",
+                              **_POPEN_KW)
         if result.returncode == 0:
             print("Interactive login successful!")
             return True
@@ -129,7 +207,8 @@ def force_interactive_login():
                                "-gu", GUEST_USER, "-gp", GUEST_PASS,
                                "runProgramInGuest", VMX, 
                                "cmd.exe", "/c", "echo", "session_test"], 
-                              capture_output=True, text=True, encoding="mbcs", errors="replace")
+                              capture_output=True, text=True, encoding="mbcs", errors="replace",
+                              **_POPEN_KW)
         return result.returncode == 0
         
     except Exception as e:
@@ -137,17 +216,15 @@ def force_interactive_login():
         return False
 
 def test_vmrun_basic():
-    # 测试基本的vmrun命令是否工作
+    # 检查 vmrun 是否存在且可执行：只做一次 stat，不再启动一次 vmrun list；
+    # vmrun 本身无法工作时，start_vm 的错误处理会报告
     print("Testing basic vmrun command...")
-    try:
-        result = subprocess.run([VMRUN, "-T", "ws", "list"], 
-                              capture_output=True, text=True, encoding="mbcs", errors="replace")
-        print("vmrun list output:", result.stdout.strip())
-        print("vmrun list errors:", result.stderr.strip())
-        return result.returncode == 0
-    except Exception as e:
-        print(f"Error testing vmrun: {e}")
+    if not (os.path.isfile(VMRUN) and os.access(VMRUN, os.X_OK)):
+        print(f"vmrun not found or not executable: {VMRUN}")
         return False
+    if os.path.exists(VMX + ".lck"):
+        print("VM lock directory present (VM is probably already running)")
+    return True
 
 def graceful_shutdown():
     run([VMRUN, "-T", "ws", "shutdown", VMX, "soft"])
@@ -166,28 +243,19 @@ if __name__ == "__main__":
     
     # 1) 启动虚拟机
     print("\n=== Starting VM ===")
-    try:
-        start_vm(gui=True)
-    except subprocess.CalledProcessError as e:
-        print(f"VM start failed with return code {e.returncode}")
-        if e.returncode == 4294967295:  # -1 in unsigned 32-bit
-            print("This usually means the VM is already running, continuing...")
-        else:
-            raise
+    start_vm(gui=True)
 
     # 2) 等待 VMware Tools 起来（意味着系统基本引导完毕）
     print("\n=== Waiting for VMware Tools ===")
     wait_for_tools(timeout=300)
 
     print("\n=== Waiting for user login ===")
-    # 首先等待一段时间让系统完全启动
-    print("Waiting 120 seconds for system to fully boot...")
-    time.sleep(120)
-    
-    # 检查是否已有交互式会话
-    if not check_interactive_session():
+    # 等待系统完全启动：最多 LOGIN_TIMEOUT 秒，检测到交互式会话就立即继续
+    print(f"Waiting up to {LOGIN_TIMEOUT:.0f} seconds for an interactive session...")
+    if not wait_for_interactive_session():
         print("No interactive session found, attempting to create one...")
         if force_interactive_login():
+            invalidate_session_cache()
             print("Interactive login successful!")
             time.sleep(5)  # 等待会话建立
         else:
@@ -229,6 +297,11 @@ if __name__ == "__main__":
     
     # run_in_guest(r"C:\Program Files (x86)\Microsoft\Edge\Application\msedge.exe",
     #              args=["https://www.mit.edu"], interactive=True, nowait=True)
+    # 多个程序可以用 run_many_in_guest 同时启动：
+    # run_many_in_guest([
+    #     (r"C:\Windows\System32\notepad.exe", None, True, True),
+    #     (r"C:\Program Files (x86)\Microsoft\Edge\Application\msedge.exe", ["https://www.mit.edu"], True, True),
+    # ])
 
     print("\n=== Script completed ===")
     # …后续你还可以用 run_in_guest 跑 PowerShell、Python、你自己的 App
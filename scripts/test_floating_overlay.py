@@ -1,17 +1,50 @@
 """Test script for floating overlay functionality."""
 
 import sys
-import time
 from pathlib import Path
 
 # Add app directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from PySide6.QtCore import QTimer
 from PySide6.QtWidgets import QApplication
 from app.floating_overlay import FloatingOverlay
 from app.models import Task
 from app.logging_setup import setup_logging, get_logger
 
+# Overlay reused across test_floating_overlay() calls in the same process
+_overlay = None
+
+
+def setup_overlay(app: QApplication) -> FloatingOverlay:
+    """Create the overlay and connect its test signals once; later calls reuse it."""
+    global _overlay
+    if _overlay is not None:
+        return _overlay
+    
+    logger = get_logger(__name__)
+    overlay = FloatingOverlay()
+    
+    # Connect signals for testing
+    def on_validate():
+        logger.info("Validate button clicked!")
+        overlay.set_status("Validating...")
+        # Simulate a one-second validation without blocking the event loop
+        QTimer.singleShot(1000, lambda: overlay.set_status("PASSED"))
+    
+    def on_close():
+        logger.info("Close button clicked!")
+        # Hide rather than destroy so a later run can show the same overlay again;
+        # quit() only leaves the event loop, the QApplication stays alive
+        overlay.hide_overlay()
+        app.quit()
+    
+    overlay.validate_requested.connect(on_validate)
+    overlay.close_requested.connect(on_close)
+    _overlay = overlay
+    return overlay
+
+
 def test_floating_overlay():
     """Test the floating overlay window."""
     # Setup logging
@@ -20,8 +53,8 @@ def test_floating_overlay():
     
     logger.info("=== Testing Floating Overlay Window ===")
     
-    # Create QApplication
-    app = QApplication(sys.argv)
+    # Reuse the QApplication if one already exists (e.g. repeated runs in one process)
+    app = QApplication.instance() or QApplication(sys.argv)
     
     # Create test task
     test_task = Task(
@@ -34,7 +67,7 @@ def test_floating_overlay():
     )
     
     # Create floating overlay
-    overlay = FloatingOverlay()
+    overlay = setup_overlay(app)
     
     # Test setting task
     logger.info("Setting test task...")
@@ -52,23 +85,6 @@ def test_floating_overlay():
     logger.info("Showing floating overlay...")
     overlay.show_overlay()
     
-    # Connect signals for testing
-    def on_validate():
-        logger.info("Validate button clicked!")
-        overlay.set_status("Validating...")
-        # Simulate validation process
-        app.processEvents()
-        time.sleep(1)
-        overlay.set_status("PASSED")
-    
-    def on_close():
-        logger.info("Close button clicked!")
-        overlay.hide_overlay()
-        app.quit()
-    
-    overlay.validate_requested.connect(on_validate)
-    overlay.close_requested.connect(on_close)
-    
     logger.info("Floating overlay test window shown. Click validate to test, or close to exit.")
     logger.info("The overlay should be draggable and stay on top of other windows.")
     
@@ -4,22 +4,18 @@ Used to test running softwares after the system has fully booted.
 Currently, the main issue is that we don't know exactly when the system would be able to
 run softwares, even though the interactive login has been successfully established. This
 script is used to test such timing: we start the VM, wait for the system to fully boot,
-and then try to run a software for every 5 seconds repeatedly until it works.
+and then try to run a software repeatedly, backing off between failures, until it works.
 """
 
 import subprocess
 import time
-import shlex
-import os
-from test_basic_start_and_running import *
-
-VMRUN = r"C:\Program Files (x86)\VMware\VMware Workstation\vmrun.exe"
-VMX   = r"E:\Virtual Machines\Windows 11 x64\Windows 11 x64 (2).vmx"
 
-GUEST_USER = "user"
-GUEST_PASS = "password"
+# VMRUN / VMX / guest credentials and the vmrun helpers all live in the
+# start-and-run script; this script only adds the launch-timing loop
+from test_basic_start_and_running import *
 
-VM_ENCRYPT_PASS = os.environ.get("VM_VMX_PASSWORD")
+# How many times to try launching the software before giving up
+MAX_RUN_ATTEMPTS = 10
 
 if __name__ == "__main__":
     # print("====== VM starting ======")
@@ -33,27 +29,27 @@ if __name__ == "__main__":
     # time_3 = time.time()
     # print(f"====== VMware Tools started in {time_3 - time_2:.2f} seconds ======")
     
-    # print("====== Waiting for user login in 120 seconds ... ======")
-    # time.sleep(120)
-    has_interactive = check_interactive_session()
+    print(f"====== Waiting up to {LOGIN_TIMEOUT:.0f} seconds for user login ... ======")
+    login_start = time.time()
+    has_interactive = wait_for_interactive_session()
     print(f"Interactive session status: {'Available' if has_interactive else 'Not available'}")
-    print(f"====== User login in 120 seconds ======")
+    print(f"====== User login checked in {time.time() - login_start:.2f} seconds ======")
 
     if has_interactive:
         print("====== Trying to run software in guest ======")
-        for idx in range(1):
+        for idx in range(MAX_RUN_ATTEMPTS):
             start_time = time.time()
             try:
                 run_in_guest(r"C:\Windows\System32\notepad.exe", interactive=True, nowait=True)
                 end_time = time.time()
                 print(f"====== Software run in guest in {end_time - start_time:.2f} seconds ======")
+                break
             except subprocess.CalledProcessError as e:
                 print(f"====== Software run in guest failed at attempt {idx + 1} ======")
                 print(f"Error: {e}")
-            finally:
-                end_time = time.time()
-                if end_time - start_time < 10:
-                    time.sleep(10 - (end_time - start_time))
+                # Only wait after a failure, backing off up to 10 seconds
+                if idx + 1 < MAX_RUN_ATTEMPTS:
+                    time.sleep(min(10, 0.5 * 2 ** idx))
         print("====== Software run in guest ======")
 
     else: